@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cachetools import LRUCache
+from firebase_admin import auth as firebase_auth
+from firebase_admin import firestore_async
+
+import local_cache
+import metrics
+from cache import redis
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+# Cached tokens are treated as expired this many seconds before their exp claim.
+TOKEN_EXPIRY_MARGIN = float(os.getenv("TOKEN_EXPIRY_MARGIN", "30"))
+FIREBASE_WORKERS = int(os.getenv("FIREBASE_WORKERS", "8"))
+
+# Keyed by a hash of the token so raw tokens are never held as keys.
+_tokens = LRUCache(maxsize=TOKEN_CACHE_SIZE)
+# verify_id_token is synchronous (and fetches signing keys over HTTP), so it runs here.
+_executor = ThreadPoolExecutor(max_workers=FIREBASE_WORKERS, thread_name_prefix="firebase")
+_db = None
+
+
+def _firestore():
+    # Created on first use so the client binds to the running event loop.
+    global _db
+    if _db is None:
+        _db = firestore_async.client()
+    return _db
+
+
+def _users():
+    return _firestore().collection("users")
+
+
+def _token_key(id_token: str) -> str:
+    return hashlib.sha256(id_token.encode()).hexdigest()
+
+
+def _user_key(uid: str) -> str:
+    return f"user:{uid}"
+
+
+def _timed(service: str, operation: str):
+    return metrics.timed(metrics.EXTERNAL_CALLS, service=service, operation=operation)
+
+
+async def verify_token(id_token: str) -> dict:
+    """
+    Verify a Firebase ID token, reusing an earlier verification until the token expires.
+    Raises whatever firebase_auth.verify_id_token raises for invalid tokens.
+    """
+    key = _token_key(id_token)
+    decoded = _tokens.get(key)
+    if decoded is not None:
+        if decoded.get("exp", 0) - TOKEN_EXPIRY_MARGIN > time.time():
+            metrics.CACHE_LOOKUPS.labels("token", "local_hit").inc()
+            return decoded
+        _tokens.pop(key, None)
+    metrics.CACHE_LOOKUPS.labels("token", "miss").inc()
+    loop = asyncio.get_running_loop()
+    async with _timed("firebase_auth", "verify_id_token"):
+        decoded = await loop.run_in_executor(_executor, firebase_auth.verify_id_token, id_token)
+    _tokens[key] = decoded
+    return decoded
+
+
+async def fetch_user(uid: str):
+    """
+    Read a user profile straight from Firestore. Returns None if it doesn't exist.
+    """
+    async with _timed("firestore", "get_user"):
+        doc = await _users().document(uid).get()
+    return doc.to_dict() if doc.exists else None
+
+
+async def get_user(uid: str):
+    """
+    Read-through cached user profile. Returns None if it doesn't exist.
+    """
+    key = _user_key(uid)
+    cached = local_cache.get(key)
+    if cached is not None:
+        metrics.CACHE_LOOKUPS.labels("user", "local_hit").inc()
+        return cached
+    metrics.CACHE_LOOKUPS.labels("user", "miss").inc()
+    user = await fetch_user(uid)
+    local_cache.put(key, user)
+    return user
+
+
+async def set_user(uid: str, data: dict, merge: bool = False):
+    async with _timed("firestore", "set_user"):
+        await _users().document(uid).set(data, merge=merge)
+    await invalidate_user(uid)
+
+
+async def update_user(uid: str, fields: dict):
+    async with _timed("firestore", "update_user"):
+        await _users().document(uid).update(fields)
+    await invalidate_user(uid)
+
+
+async def invalidate_user(uid: str):
+    key = _user_key(uid)
+    local_cache.evict(key)
+    try:
+        await local_cache.publish_invalidation(redis, key)
+    except Exception as e:
+        print("failed to publish user invalidation:", e)
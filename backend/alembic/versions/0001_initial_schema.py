@@ -0,0 +1,97 @@
+"""initial schema
+
+Tables as previously created by Base.metadata.create_all. Databases that predate
+migrations are stamped at this revision instead of running it (see db.upgrade_schema).
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-08-04 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "chat_sessions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("topic", sa.Text()),
+        sa.Column("summary", sa.Text()),
+        sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "messages",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "chat_session_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("chat_sessions.id", ondelete="CASCADE"),
+        ),
+        sa.Column("sender", sa.String(10)),
+        sa.Column("text", sa.Text()),
+        sa.Column("timestamp", sa.TIMESTAMP(), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "feedback",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "message_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("messages.id", ondelete="CASCADE"),
+        ),
+        sa.Column("user_email", sa.Text()),
+        sa.Column("reaction", sa.Text()),
+        sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "flagged_responses",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("message_id", postgresql.UUID(as_uuid=True)),
+        sa.Column("text", sa.Text()),
+        sa.Column("user_email", sa.Text()),
+        sa.Column("reviewed", sa.Boolean()),
+        sa.Column("review_notes", sa.Text()),
+        sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "mass_readings",
+        sa.Column("date", sa.String(), primary_key=True),
+        sa.Column("saint", sa.String()),
+        sa.Column("season", sa.String()),
+        sa.Column("season_week", sa.String()),
+        sa.Column("year", sa.String()),
+        sa.Column("first", sa.String()),
+        sa.Column("gospel", sa.String()),
+        sa.Column("psalm", sa.String()),
+        sa.Column("second", sa.String(), nullable=True),
+    )
+    op.create_table(
+        "pastoral_memory",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", sa.String(), nullable=False, unique=True),
+        sa.Column("themes", postgresql.ARRAY(sa.String())),
+        sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("pastoral_memory")
+    op.drop_table("mass_readings")
+    op.drop_table("flagged_responses")
+    op.drop_table("feedback")
+    op.drop_table("messages")
+    op.drop_table("chat_sessions")
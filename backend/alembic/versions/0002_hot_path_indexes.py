@@ -0,0 +1,75 @@
+"""hot path indexes
+
+Indexes for the router queries:
+- messages by chat_session_id ordered by timestamp (get_session, list_sessions, deletes),
+  plus a partial index for the previous AI answer lookup in prepare_chat_turn;
+- chat_sessions by (user_id, topic, created_at), plus a partial index matching the
+  list_sessions keyset order for topic = 'chat';
+- feedback and flagged_responses by message_id (user data deletion).
+pastoral_memory.user_id is already covered by its unique constraint.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-08-04 00:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_messages_session_timestamp",
+        "messages",
+        ["chat_session_id", "timestamp"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_messages_session_ai_timestamp",
+        "messages",
+        ["chat_session_id", "timestamp"],
+        postgresql_where=sa.text("sender = 'ai'"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_chat_sessions_user_topic_created",
+        "chat_sessions",
+        ["user_id", "topic", "created_at"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_chat_sessions_user_chat_recent",
+        "chat_sessions",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        postgresql_where=sa.text("topic = 'chat'"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_feedback_message_id", "feedback", ["message_id"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_flagged_responses_message_id",
+        "flagged_responses",
+        ["message_id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_flagged_responses_message_id", table_name="flagged_responses")
+    op.drop_index("ix_feedback_message_id", table_name="feedback")
+    op.drop_index("ix_chat_sessions_user_chat_recent", table_name="chat_sessions")
+    op.drop_index("ix_chat_sessions_user_topic_created", table_name="chat_sessions")
+    op.drop_index("ix_messages_session_ai_timestamp", table_name="messages")
+    op.drop_index("ix_messages_session_timestamp", table_name="messages")
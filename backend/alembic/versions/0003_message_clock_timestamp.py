@@ -0,0 +1,31 @@
+"""message clock timestamp
+
+A chat turn's messages are now inserted in one transaction, where now() is the same for
+every row. clock_timestamp() keeps the user message ordered before the AI reply.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-08-05 00:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column("messages", "timestamp", server_default=sa.text("clock_timestamp()"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column("messages", "timestamp", server_default=sa.text("now()"))
@@ -0,0 +1,62 @@
+"""analytics events
+
+analytics_events as a declared table, range-partitioned by month on created_at.
+Monthly partitions are created ahead of time by partitions.maintain;
+the default partition only catches rows outside them.
+
+The table used to be written with raw SQL and was never created by the app, so any
+hand-made copy is kept as analytics_events_legacy rather than dropped.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-08-06 00:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_class
+                WHERE oid = to_regclass('analytics_events') AND relkind = 'r'
+            ) THEN
+                ALTER TABLE analytics_events RENAME TO analytics_events_legacy;
+            END IF;
+        END $$
+        """
+    )
+    op.create_table(
+        "analytics_events",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now(), nullable=False),
+        sa.Column("user_id", sa.String()),
+        sa.Column("event_type", sa.Text(), nullable=False),
+        sa.Column("data", postgresql.JSONB()),
+        sa.PrimaryKeyConstraint("id", "created_at"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index(
+        "ix_analytics_events_user_created", "analytics_events", ["user_id", "created_at"]
+    )
+    op.execute("CREATE TABLE analytics_events_default PARTITION OF analytics_events DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("analytics_events")
@@ -0,0 +1,181 @@
+"""partition chat tables
+
+chat_sessions (by created_at) and messages (by timestamp) become range-partitioned by
+month. The existing table is not copied: rows from the current month on are moved into
+new monthly partitions and the rest of the old table is attached as a single
+<table>_archive partition covering everything before this month. Retention detaches
+partitions once they age out (see partitions.maintain).
+
+A partitioned table's primary key must include the partition key, so the primary keys
+become (id, created_at) and (id, timestamp), and the foreign keys messages -> chat_sessions
+and feedback -> messages are dropped. Their cascades are done by deletion.py instead.
+
+Moving the current month's rows and rebuilding the archive's primary key scale with the
+tables. The app runs migrations at startup without a statement timeout (db.migrate), but
+on large tables it is better to run `alembic upgrade head` (or apply the output of
+`alembic upgrade head --sql`) before deploying, so workers don't start behind the lock.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-08-07 00:10:00
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 2
+
+
+def _month_start(offset: int) -> date:
+    today = date.today()
+    month = today.month - 1 + offset
+    return date(today.year + month // 12, month % 12 + 1, 1)
+
+
+def _columns(table: str) -> list:
+    if table == "chat_sessions":
+        return [
+            sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column("user_id", sa.String(), nullable=False),
+            sa.Column("topic", sa.Text()),
+            sa.Column("summary", sa.Text()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now(), nullable=False),
+        ]
+    return [
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("chat_session_id", postgresql.UUID(as_uuid=True)),
+        sa.Column("sender", sa.String(10)),
+        sa.Column("text", sa.Text()),
+        sa.Column(
+            "timestamp", sa.TIMESTAMP(), server_default=sa.text("clock_timestamp()"), nullable=False
+        ),
+    ]
+
+
+def _create_indexes(table: str):
+    if table == "chat_sessions":
+        op.create_index(
+            "ix_chat_sessions_user_topic_created",
+            "chat_sessions",
+            ["user_id", "topic", "created_at"],
+        )
+        op.create_index(
+            "ix_chat_sessions_user_chat_recent",
+            "chat_sessions",
+            ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+            postgresql_where=sa.text("topic = 'chat'"),
+        )
+    else:
+        op.create_index(
+            "ix_messages_session_timestamp", "messages", ["chat_session_id", "timestamp"]
+        )
+        op.create_index(
+            "ix_messages_session_ai_timestamp",
+            "messages",
+            ["chat_session_id", "timestamp"],
+            postgresql_where=sa.text("sender = 'ai'"),
+        )
+
+
+INDEXES = {
+    "chat_sessions": ["ix_chat_sessions_user_topic_created", "ix_chat_sessions_user_chat_recent"],
+    "messages": ["ix_messages_session_timestamp", "ix_messages_session_ai_timestamp"],
+}
+
+
+def _partition(table: str, key: str):
+    archive = f"{table}_archive"
+    current = _month_start(0)
+    names = ", ".join(f'"{column.name}"' for column in _columns(table))
+
+    op.execute(f"UPDATE {table} SET \"{key}\" = 'epoch' WHERE \"{key}\" IS NULL")
+    op.execute(f"ALTER TABLE {table} RENAME TO {archive}")
+    op.execute(f"ALTER INDEX {table}_pkey RENAME TO {archive}_pkey")
+    for index in INDEXES[table]:
+        # Equivalent indexes are reused when the old table is attached below.
+        op.execute(f"ALTER INDEX IF EXISTS {index} RENAME TO {archive}_{index[3:]}")
+
+    op.create_table(
+        table,
+        *_columns(table),
+        sa.PrimaryKeyConstraint("id", key),
+        postgresql_partition_by=f'RANGE ("{key}")',
+    )
+    _create_indexes(table)
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    for offset in range(MONTHS_AHEAD + 1):
+        start, end = _month_start(offset), _month_start(offset + 1)
+        op.execute(
+            f"CREATE TABLE {table}_{start:%Y_%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+
+    op.execute(
+        f"INSERT INTO {table} ({names}) SELECT {names} FROM {archive} WHERE \"{key}\" >= '{current}'"
+    )
+    op.execute(f"DELETE FROM {archive} WHERE \"{key}\" >= '{current}'")
+    op.execute(f'ALTER TABLE {archive} ALTER COLUMN "{key}" SET NOT NULL')
+    # A partition can only have the parent's primary key, so (id) becomes (id, key).
+    op.execute(f"ALTER TABLE {archive} DROP CONSTRAINT {archive}_pkey")
+    op.execute(f'ALTER TABLE {archive} ADD CONSTRAINT {archive}_pkey PRIMARY KEY (id, "{key}")')
+    # Lets ATTACH skip its validation scan.
+    op.execute(f"ALTER TABLE {archive} ADD CONSTRAINT {archive}_bound CHECK (\"{key}\" < '{current}')")
+    op.execute(
+        f"ALTER TABLE {table} ATTACH PARTITION {archive} FOR VALUES FROM (MINVALUE) TO ('{current}')"
+    )
+    op.execute(f"ALTER TABLE {archive} DROP CONSTRAINT {archive}_bound")
+
+
+def _unpartition(table: str):
+    names = ", ".join(f'"{column.name}"' for column in _columns(table))
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_partitioned")
+    for index in INDEXES[table]:
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_partitioned")
+    op.execute(f"ALTER INDEX {table}_pkey RENAME TO {table}_partitioned_pkey")
+    op.create_table(table, *_columns(table), sa.PrimaryKeyConstraint("id"))
+    _create_indexes(table)
+    op.execute(f"INSERT INTO {table} ({names}) SELECT {names} FROM {table}_partitioned")
+    op.execute(f"DROP TABLE {table}_partitioned")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE feedback DROP CONSTRAINT IF EXISTS feedback_message_id_fkey")
+    op.execute("ALTER TABLE messages DROP CONSTRAINT IF EXISTS messages_chat_session_id_fkey")
+    _partition("chat_sessions", "created_at")
+    _partition("messages", "timestamp")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _unpartition("messages")
+    _unpartition("chat_sessions")
+    op.execute("DELETE FROM feedback WHERE message_id NOT IN (SELECT id FROM messages)")
+    op.execute("DELETE FROM messages WHERE chat_session_id NOT IN (SELECT id FROM chat_sessions)")
+    op.create_foreign_key(
+        "messages_chat_session_id_fkey",
+        "messages",
+        "chat_sessions",
+        ["chat_session_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    op.create_foreign_key(
+        "feedback_message_id_fkey",
+        "feedback",
+        "messages",
+        ["message_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
@@ -0,0 +1,39 @@
+"""session summary until
+
+chat_sessions.summary_until marks the newest message already folded into the rolling
+summary (see context.refresh_summary). Prompts now use the summary and the latest
+messages instead of the first AI answer, so the partial index for that lookup is dropped.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-08-08 00:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("chat_sessions", sa.Column("summary_until", sa.TIMESTAMP()))
+    op.drop_index("ix_messages_session_ai_timestamp", table_name="messages", if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        "ix_messages_session_ai_timestamp",
+        "messages",
+        ["chat_session_id", "timestamp"],
+        postgresql_where=sa.text("sender = 'ai'"),
+    )
+    op.drop_column("chat_sessions", "summary_until")
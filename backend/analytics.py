@@ -0,0 +1,129 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert
+
+import models
+from db import engine
+
+ANALYTICS_BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", "500"))
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "2"))
+# Events buffered beyond this are dropped rather than slowing requests down.
+ANALYTICS_QUEUE_SIZE = int(os.getenv("ANALYTICS_QUEUE_SIZE", "20000"))
+# "newest" drops the incoming event when the buffer is full, "oldest" evicts the oldest one.
+ANALYTICS_DROP_POLICY = os.getenv("ANALYTICS_DROP_POLICY", "newest").lower()
+ANALYTICS_SHUTDOWN_TIMEOUT = float(os.getenv("ANALYTICS_SHUTDOWN_TIMEOUT", "10"))
+# COPY is the fastest bulk path; multi-row INSERT works everywhere.
+ANALYTICS_USE_COPY = os.getenv("ANALYTICS_USE_COPY", "true").lower() == "true"
+
+COLUMNS = ("id", "created_at", "user_id", "event_type", "data")
+
+_queue = None
+_flusher = None
+# The batch being collected and the flush in progress, so shutdown can finish them.
+_batch = []
+_inflight = None
+_stats = {"enqueued": 0, "dropped": 0, "written": 0, "failed": 0, "flushes": 0}
+
+
+def log(user_id: str, event: str, data: dict = None):
+    """
+    Buffer an analytics event. Never blocks or raises; events are dropped when the buffer is full.
+    """
+    if _queue is None:
+        _stats["dropped"] += 1
+        return
+    row = (uuid.uuid4(), datetime.now(), user_id, event, data)
+    try:
+        _queue.put_nowait(row)
+    except asyncio.QueueFull:
+        _stats["dropped"] += 1
+        if ANALYTICS_DROP_POLICY != "oldest":
+            return
+        _queue.get_nowait()
+        _queue.put_nowait(row)
+    _stats["enqueued"] += 1
+
+
+def stats() -> dict:
+    return {**_stats, "queued": _queue.qsize() if _queue else 0, "maxsize": ANALYTICS_QUEUE_SIZE}
+
+
+async def _write(rows: list):
+    async with engine.connect() as conn:
+        if ANALYTICS_USE_COPY:
+            raw = await conn.get_raw_connection()
+            records = [row[:-1] + (json.dumps(row[-1], default=str),) for row in rows]
+            await raw.driver_connection.copy_records_to_table(
+                models.AnalyticsEvent.__tablename__, records=records, columns=COLUMNS
+            )
+        else:
+            await conn.execute(
+                insert(models.AnalyticsEvent), [dict(zip(COLUMNS, row)) for row in rows]
+            )
+            await conn.commit()
+
+
+async def _flush(rows: list):
+    try:
+        await _write(rows)
+        _stats["written"] += len(rows)
+    except Exception as e:
+        # Analytics is best effort: a failed batch is counted and dropped.
+        _stats["failed"] += len(rows)
+        print(f"analytics flush of {len(rows)} events failed:", e)
+    _stats["flushes"] += 1
+
+
+async def _run():
+    global _batch, _inflight
+    while True:
+        _batch.append(await _queue.get())
+        deadline = time.monotonic() + ANALYTICS_FLUSH_INTERVAL
+        while len(_batch) < ANALYTICS_BATCH_SIZE:
+            if not _queue.empty():
+                _batch.append(_queue.get_nowait())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                _batch.append(await asyncio.wait_for(_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        rows, _batch = _batch, []
+        _inflight = asyncio.ensure_future(_flush(rows))
+        await asyncio.shield(_inflight)
+
+
+def start():
+    global _queue, _flusher
+    _queue = asyncio.Queue(maxsize=ANALYTICS_QUEUE_SIZE)
+    _flusher = asyncio.create_task(_run())
+
+
+async def stop():
+    """
+    Stop the flusher and write out whatever is still buffered.
+    """
+    global _queue, _batch
+    if _flusher is None:
+        return
+    _flusher.cancel()
+    queue, _queue = _queue, None
+    rows, _batch = _batch, []
+    while not queue.empty():
+        rows.append(queue.get_nowait())
+    try:
+        if _inflight is not None:
+            await asyncio.wait_for(asyncio.shield(_inflight), ANALYTICS_SHUTDOWN_TIMEOUT)
+        for i in range(0, len(rows), ANALYTICS_BATCH_SIZE):
+            await asyncio.wait_for(
+                _flush(rows[i:i + ANALYTICS_BATCH_SIZE]), ANALYTICS_SHUTDOWN_TIMEOUT
+            )
+    except asyncio.TimeoutError:
+        print("analytics shutdown flush timed out")
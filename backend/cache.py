@@ -1,19 +1,93 @@
-import aioredis
+from redis import asyncio as aioredis
+from redis.exceptions import ResponseError
+import json
 import os
+import zlib
+import msgpack
+import zstandard
 from dotenv import load_dotenv
 
 load_dotenv()
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 
+# Text client for locks, pub/sub and counters; binary client for encoded cache values.
 redis = aioredis.from_url(REDIS_URL, decode_responses=True)
+redis_bytes = aioredis.from_url(REDIS_URL)
 
 CACHE_EXPIRE = 60 * 60 * 24  # 24 hours
 
+# Values above this size are compressed.
+COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "512"))
+
+# First byte of every encoded value. Legacy entries are plain JSON text, which never starts with these.
+FORMAT_MSGPACK = 1
+FORMAT_MSGPACK_ZLIB = 2
+FORMAT_MSGPACK_ZSTD = 3
+
+# Namespaces whose dict values are stored as Redis hashes so single fields can be read.
+HASH_NAMESPACES = ("mass:",)
+
+_zstd_compressor = zstandard.ZstdCompressor(level=6)
+_zstd_decompressor = zstandard.ZstdDecompressor()
+
+
+def encode(value) -> bytes:
+    packed = msgpack.packb(value, use_bin_type=True)
+    if len(packed) < COMPRESS_MIN_BYTES:
+        return bytes([FORMAT_MSGPACK]) + packed
+    return bytes([FORMAT_MSGPACK_ZSTD]) + _zstd_compressor.compress(packed)
+
+
+def decode(raw: bytes):
+    version, body = raw[0], raw[1:]
+    if version == FORMAT_MSGPACK:
+        return msgpack.unpackb(body, raw=False)
+    if version == FORMAT_MSGPACK_ZLIB:
+        # Still read, for entries written before zstd was required.
+        return msgpack.unpackb(zlib.decompress(body), raw=False)
+    if version == FORMAT_MSGPACK_ZSTD:
+        return msgpack.unpackb(_zstd_decompressor.decompress(body), raw=False)
+    # Legacy JSON entry written before the binary format.
+    return json.loads(raw)
+
+
+def is_hash_key(key: str) -> bool:
+    return key.startswith(HASH_NAMESPACES)
+
+
+async def get_value(key: str):
+    if is_hash_key(key):
+        try:
+            fields = await redis.hgetall(key)
+            if fields:
+                return fields
+        except ResponseError:
+            pass  # legacy entry stored as a string
+    raw = await redis_bytes.get(key)
+    if raw is None:
+        return None
+    return decode(raw)
+
+
+async def set_value(key: str, value, expire: int):
+    if is_hash_key(key) and isinstance(value, dict):
+        mapping = {field: "" if v is None else str(v) for field, v in value.items()}
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, expire)
+            await pipe.execute()
+        return
+    await redis_bytes.set(key, encode(value), ex=expire)
+
+
+async def get_field(key: str, field: str):
+    return await redis.hget(key, field)
+
+
 async def get_cached_reading(date: str):
     return await redis.hgetall(f"mass:{date}")
 
 async def cache_reading(date: str, reading: dict):
-    await redis.hset(f"mass:{date}", mapping=reading)
-    await redis.expire(f"mass:{date}", CACHE_EXPIRE)
-
+    await set_value(f"mass:{date}", reading, CACHE_EXPIRE)
@@ -0,0 +1,220 @@
+import asyncio
+import os
+
+from sqlalchemy import select, update
+
+import llm
+import models
+import prompts
+import utils
+from db import AsyncSessionLocal
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to an estimate
+    tiktoken = None
+
+# Hard cap on the tokens of conversation history put into a prompt (summary + recent turns).
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# The summary's share of the budget; the rest goes to the most recent turns.
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "300"))
+# Messages (user and AI) always kept verbatim; older ones are folded into the summary.
+CONTEXT_RECENT_MESSAGES = int(os.getenv("CONTEXT_RECENT_MESSAGES", "6"))
+# The summary is refreshed once this many messages have left the recent window. Until
+# then they stay in the prompt verbatim, so every message is in one or the other.
+CONTEXT_SUMMARY_EVERY = int(os.getenv("CONTEXT_SUMMARY_EVERY", "4"))
+CONTEXT_SUMMARY_MAX_FOLD = int(os.getenv("CONTEXT_SUMMARY_MAX_FOLD", "40"))
+# Most messages read per prompt or per refresh.
+CONTEXT_MAX_UNFOLDED = CONTEXT_RECENT_MESSAGES + CONTEXT_SUMMARY_MAX_FOLD
+CONTEXT_SUMMARY_MODEL = os.getenv("CONTEXT_SUMMARY_MODEL", "gpt-4o-mini")
+
+SPEAKERS = {"ai": "Companion", "user": "User"}
+
+try:
+    _encoding = tiktoken.get_encoding("o200k_base") if tiktoken else None
+except Exception as e:  # the encoding file could not be loaded
+    print("tiktoken unavailable, estimating token counts:", e)
+    _encoding = None
+# Summary refreshes in flight on this worker, by session.
+_refreshing = {}
+
+
+def count_tokens(text: str) -> int:
+    if _encoding:
+        return len(_encoding.encode(text))
+    # Roughly 4 characters per token for English; 3 keeps the estimate on the safe side.
+    return len(text) // 3 + 1
+
+
+def truncate(text: str, tokens: int, keep_end: bool = False) -> str:
+    """
+    Cut text to at most the given number of tokens, keeping its start (or its end).
+    """
+    if tokens <= 0:
+        return ""
+    if _encoding:
+        encoded = _encoding.encode(text)
+        if len(encoded) <= tokens:
+            return text
+        return _encoding.decode(encoded[-tokens:] if keep_end else encoded[:tokens])
+    chars = (tokens - 1) * 3
+    if len(text) <= chars:
+        return text
+    return text[-chars:] if keep_end else text[:chars]
+
+
+def _line(sender: str, text: str) -> str:
+    return f"{SPEAKERS.get(sender, sender)}: {text}"
+
+
+def assemble(summary: str, recent: list, budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Build the history block from the summary and (sender, text) pairs, oldest first.
+    The summary is capped at CONTEXT_SUMMARY_TOKENS; recent turns fill the rest of the
+    budget newest first, and the oldest turn that doesn't fit whole is cut from the front.
+    """
+    parts = []
+    if summary:
+        summary = truncate(summary, min(CONTEXT_SUMMARY_TOKENS, budget))
+        parts.append(f"Summary of earlier conversation: {summary}")
+        budget -= count_tokens(parts[0])
+    lines = []
+    for sender, text in reversed(recent):
+        line = _line(sender, text)
+        cost = count_tokens(line) + 1
+        if cost > budget:
+            line = truncate(line, budget - 1, keep_end=True)
+            if line:
+                lines.append(line)
+            break
+        lines.append(line)
+        budget -= cost
+    parts.extend(reversed(lines))
+    return "\n".join(parts)
+
+
+def read_summary(summary):
+    # Summaries hold conversation content, so they are encrypted like messages.
+    return utils.decrypt_text(summary) if summary else summary
+
+
+def summary_state(session_id):
+    return select(
+        models.ChatSession.summary,
+        models.ChatSession.summary_until,
+        models.ChatSession.created_at,
+    ).where(models.ChatSession.id == session_id)
+
+
+def _not_folded(query, created_at, summary_until):
+    # Always bounds the partition key, so only the partitions since the session started
+    # (or since its summary) are read: a message is never older than its session.
+    if summary_until is not None:
+        return query.where(models.Message.timestamp > summary_until)
+    return query.where(models.Message.timestamp >= created_at)
+
+
+def unfolded_messages(session_id, created_at, summary_until):
+    """
+    The session's messages not yet folded into its summary, newest first. If refreshes
+    fall behind by more than CONTEXT_MAX_UNFOLDED, the oldest wait for the next refresh.
+    """
+    query = (
+        select(models.Message.id, models.Message.sender, models.Message.text)
+        .where(models.Message.chat_session_id == session_id)
+        .order_by(models.Message.timestamp.desc())
+        .limit(CONTEXT_MAX_UNFOLDED)
+    )
+    return _not_folded(query, created_at, summary_until)
+
+
+async def build_history(db, session_id) -> str:
+    """
+    The token-budgeted conversation history for a session, before the current message:
+    the summary plus every message after it, as many as fit newest first.
+    """
+    session = await db.execute(summary_state(session_id))
+    current = session.first()
+    if current is None:
+        return ""
+    result = await db.execute(
+        unfolded_messages(session_id, current.created_at, current.summary_until)
+    )
+    rows = result.fetchall()[::-1]
+    texts = await utils.decrypt_messages([(row.id, row.text) for row in rows])
+    return assemble(
+        read_summary(current.summary), [(row.sender, text) for row, text in zip(rows, texts)]
+    )
+
+
+async def refresh_summary(session_id):
+    """
+    Fold messages that have left the recent window into the session's summary.
+    Does nothing until CONTEXT_SUMMARY_EVERY messages are waiting.
+    """
+    async with AsyncSessionLocal() as db:
+        session = await db.execute(summary_state(session_id))
+        current = session.first()
+        if current is None:
+            return
+        # Oldest first, so the summary always advances over a contiguous run of messages.
+        query = (
+            select(
+                models.Message.id,
+                models.Message.sender,
+                models.Message.text,
+                models.Message.timestamp,
+            )
+            .where(models.Message.chat_session_id == session_id)
+            .order_by(models.Message.timestamp)
+            .limit(CONTEXT_MAX_UNFOLDED)
+        )
+        query = _not_folded(query, current.created_at, current.summary_until)
+        rows = (await db.execute(query)).fetchall()
+        fold = rows[: len(rows) - CONTEXT_RECENT_MESSAGES]
+        if len(fold) < CONTEXT_SUMMARY_EVERY:
+            return
+        await db.commit()
+
+        texts = await utils.decrypt_messages([(row.id, row.text) for row in fold])
+        conversation = "\n".join(_line(row.sender, text) for row, text in zip(fold, texts))
+        summary = await llm.chat(
+            prompts.messages(
+                "summary",
+                summary=read_summary(current.summary) or "(none yet)",
+                conversation=truncate(conversation, CONTEXT_TOKEN_BUDGET * 4, keep_end=True),
+            ),
+            model=CONTEXT_SUMMARY_MODEL,
+            max_tokens=CONTEXT_SUMMARY_TOKENS,
+        )
+        # Only applies if no other worker moved the summary on in the meantime.
+        await db.execute(
+            update(models.ChatSession)
+            .where(models.ChatSession.id == session_id)
+            .where(
+                models.ChatSession.summary_until.is_not_distinct_from(current.summary_until)
+            )
+            .values(
+                summary=utils.encrypt_text(summary.strip()),
+                summary_until=fold[-1].timestamp,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+
+async def _refresh(session_id):
+    try:
+        await refresh_summary(session_id)
+    except Exception as e:
+        print(f"summary refresh for {session_id} failed:", e)
+    finally:
+        _refreshing.pop(session_id, None)
+
+
+def schedule_refresh(session_id):
+    """
+    Refresh the summary in the background, at most once at a time per session on this worker.
+    """
+    if session_id not in _refreshing:
+        _refreshing[session_id] = asyncio.create_task(_refresh(session_id))
@@ -1,7 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, exists, tuple_
 from sqlalchemy.future import select
-from models import MassReading
-from datetime import date, datetime
+from models import ChatSession, MassReading, Message
+from datetime import date, datetime, timedelta
 from fastapi import Depends
 from db import get_db
 async def get_reading_by_date(date: str, session: AsyncSession):
@@ -12,4 +13,85 @@ async def get_reading_by_date(date: str, session: AsyncSession):
 async def save_reading(session: AsyncSession, data: dict):
     reading = MassReading(**data)
     session.add(reading)
-    await session.commit()
\ No newline at end of file
+    await session.commit()
+
+
+# Statement builders for the chat session handlers, shared with explain_check.py so the
+# EXPLAIN check runs the same SQL as the routers.
+def message_by_id(message_id):
+    return Message.__table__.select().where(Message.id == message_id)
+
+
+def owned_session(session_id, uid):
+    return (
+        ChatSession.__table__.select()
+        .where(ChatSession.id == session_id)
+        .where(ChatSession.user_id == uid)
+    )
+
+
+def first_messages(session_id, created_at, limit: int = 3):
+    # Bounded by the session's start (see with_messages) so older partitions are skipped.
+    return (
+        Message.__table__.select()
+        .where(Message.chat_session_id == session_id)
+        .where(Message.timestamp >= created_at)
+        .order_by(Message.timestamp)
+        .limit(limit)
+    )
+
+
+def recent_chat_page(uid: str, limit: int, cursor=None):
+    """
+    One page of the user's chats from the last 30 days that have messages, newest first
+    (keyset on created_at, id). Fetches one extra row to detect a next page. cursor is the
+    (created_at, id) of the last session on the previous page.
+    """
+    thirty_days_ago = datetime.now() - timedelta(days=30)
+    page = (
+        select(
+            ChatSession.id,
+            ChatSession.created_at,
+            ChatSession.topic,
+            ChatSession.summary,
+        )
+        .where(ChatSession.user_id == uid)
+        .where(ChatSession.created_at > thirty_days_ago)
+        .where(ChatSession.topic == "chat")
+        .where(
+            exists()
+            .where(Message.chat_session_id == ChatSession.id)
+            .where(Message.timestamp >= ChatSession.created_at)
+        )
+        .order_by(ChatSession.created_at.desc(), ChatSession.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        page = page.where(
+            tuple_(ChatSession.created_at, ChatSession.id)
+            < tuple_(*cursor, types=[ChatSession.created_at.type, ChatSession.id.type])
+        )
+    return page
+
+
+def with_messages(page):
+    """
+    The sessions of a page joined to their messages, oldest message first in each session.
+    A message is never older than its session, and bounding the partition key by that lets
+    Postgres skip the messages partitions (and the archive) from before the session.
+    """
+    page = page.cte("page")
+    return (
+        select(
+            page,
+            Message.id.label("message_id"),
+            Message.sender,
+            Message.text,
+            Message.timestamp,
+        )
+        .join(
+            Message,
+            and_(Message.chat_session_id == page.c.id, Message.timestamp >= page.c.created_at),
+        )
+        .order_by(page.c.created_at.desc(), page.c.id.desc(), Message.timestamp)
+    )
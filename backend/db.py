@@ -1,12 +1,136 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlalchemy import exc, inspect, text
+from uuid import uuid4
 import os
+import time
+
+import metrics
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_async_engine(DATABASE_URL, future=True, echo=False)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
+# Set when connecting through PgBouncer in transaction mode.
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+# Arbitrary key for the advisory lock that serializes migrations across workers.
+MIGRATION_LOCK_ID = 726513
+
+_pool_stats = {"checkouts": 0, "timeouts": 0, "wait_total": 0.0, "wait_max": 0.0}
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long checkouts wait for a connection.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            _pool_stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            _pool_stats["checkouts"] += 1
+            _pool_stats["wait_total"] += waited
+            _pool_stats["wait_max"] = max(_pool_stats["wait_max"], waited)
+            metrics.DB_POOL_WAIT.observe(waited)
+
+
+def _connect_args(command_timeout) -> dict:
+    connect_args = {"command_timeout": command_timeout}
+    if DB_PGBOUNCER:
+        # Transaction-mode PgBouncer may hand each transaction a different server connection,
+        # so named prepared statements can't be cached or reused across them.
+        connect_args.update(
+            statement_cache_size=0,
+            prepared_statement_cache_size=0,
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__",
+        )
+    return connect_args
+
+
+def _engine_options() -> dict:
+    connect_args = _connect_args(DB_COMMAND_TIMEOUT)
+    if DB_PGBOUNCER:
+        # PgBouncer does the pooling.
+        return {"poolclass": NullPool, "connect_args": connect_args}
+    return {
+        "poolclass": InstrumentedPool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+engine = create_async_engine(DATABASE_URL, future=True, echo=False, **_engine_options())
 AsyncSessionLocal = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+def pool_stats() -> dict:
+    """
+    Connection pool usage for this worker: current in-use/overflow counts and checkout waits.
+    """
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedPool):
+        return {"pool": type(pool).__name__}
+    checkouts = _pool_stats["checkouts"]
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": checkouts,
+        "timeouts": _pool_stats["timeouts"],
+        "wait_avg_ms": round(_pool_stats["wait_total"] / checkouts * 1000, 3) if checkouts else 0.0,
+        "wait_max_ms": round(_pool_stats["wait_max"] * 1000, 3),
+    }
+
+
+def upgrade_schema(connection):
+    """
+    Run Alembic migrations up to head on the given (sync) connection.
+    Databases created by create_all before migrations existed are stamped at 0001 first.
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+    config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    config.attributes["connection"] = connection
+    inspector = inspect(connection)
+    if not inspector.has_table("alembic_version") and inspector.has_table("chat_sessions"):
+        command.stamp(config, "0001")
+    command.upgrade(config, "head")
+
+
+async def migrate():
+    """
+    Run upgrade_schema on a dedicated connection without DB_COMMAND_TIMEOUT, since
+    migrations that move or index data can take longer than a request query may.
+    """
+    migration_engine = create_async_engine(
+        DATABASE_URL, poolclass=NullPool, connect_args=_connect_args(None)
+    )
+    try:
+        async with migration_engine.begin() as conn:
+            await conn.run_sync(upgrade_schema)
+    finally:
+        await migration_engine.dispose()
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, select
+
+import accounts
+import models
+from cache import redis
+from db import AsyncSessionLocal
+
+# Rows removed per transaction, so each batch holds its locks only briefly.
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "1000"))
+# How long a finished job's status stays available for polling.
+DELETE_STATUS_TTL = int(os.getenv("DELETE_STATUS_TTL", str(60 * 60 * 24)))
+
+# A queued or running job whose heartbeat is older than this is taken to have died with
+# its worker, and a new request may start it again.
+DELETE_HEARTBEAT_TIMEOUT = int(os.getenv("DELETE_HEARTBEAT_TIMEOUT", "60"))
+
+RUNNING = ("queued", "running")
+
+# Claim the job unless a live one holds it: check and set in one step, so two requests
+# can't both start it. KEYS[1] status key; ARGV now, heartbeat timeout, queued_at, ttl.
+CLAIM_JOB = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if status == 'queued' or status == 'running' then
+    local heartbeat = tonumber(redis.call('HGET', KEYS[1], 'heartbeat') or '0') or 0
+    if tonumber(ARGV[1]) - heartbeat < tonumber(ARGV[2]) then
+        return 0
+    end
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'status', 'queued', 'queued_at', ARGV[3], 'heartbeat', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+
+def _status_key(user_id: str) -> str:
+    return f"deletion:{user_id}"
+
+
+def _batches(user_id: str, n: int) -> list:
+    """
+    (table, statement) pairs, in dependency order. Each statement deletes at most n rows.
+    The partitioned chat tables have no foreign keys, so dependent rows are deleted here.
+    """
+    Message, ChatSession = models.Message, models.ChatSession
+    messages = (
+        select(Message.id)
+        .join(ChatSession, ChatSession.id == Message.chat_session_id)
+        .where(ChatSession.user_id == user_id)
+        .limit(n)
+        .cte("doomed")
+    )
+    # Feedback and flagged responses of a batch go in the same statement as its messages.
+    feedback = (
+        delete(models.Feedback)
+        .where(models.Feedback.message_id.in_(select(messages.c.id)))
+        .cte("feedback")
+    )
+    flagged = (
+        delete(models.FlaggedResponse)
+        .where(models.FlaggedResponse.message_id.in_(select(messages.c.id)))
+        .cte("flagged")
+    )
+    sessions = select(ChatSession.id).where(ChatSession.user_id == user_id).limit(n)
+    analytics = (
+        select(models.AnalyticsEvent.id)
+        .where(models.AnalyticsEvent.user_id == user_id)
+        .limit(n)
+    )
+    return [
+        (
+            "messages",
+            delete(Message)
+            .where(Message.id.in_(select(messages.c.id)))
+            .add_cte(feedback, flagged),
+        ),
+        ("chat_sessions", delete(ChatSession).where(ChatSession.id.in_(sessions))),
+        (
+            "pastoral_memory",
+            delete(models.PastoralMemory).where(models.PastoralMemory.user_id == user_id),
+        ),
+        (
+            "analytics_events",
+            delete(models.AnalyticsEvent)
+            .where(models.AnalyticsEvent.user_id == user_id)
+            .where(models.AnalyticsEvent.id.in_(analytics)),
+        ),
+    ]
+
+
+async def _set_status(user_id: str, **fields):
+    try:
+        key = _status_key(user_id)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={k: str(v) for k, v in fields.items()})
+            pipe.expire(key, DELETE_STATUS_TTL)
+            await pipe.execute()
+    except Exception as e:
+        print("failed to record deletion status:", e)
+
+
+async def status(user_id: str):
+    """
+    The latest deletion job for user_id, or None if there is none.
+    """
+    return await redis.hgetall(_status_key(user_id)) or None
+
+
+async def enqueue(user_id: str):
+    """
+    Claim a background deletion for user_id unless a live one is already queued or running.
+    Returns (claimed, job status); only the caller that claimed it should start the job.
+    """
+    claimed = await redis.eval(
+        CLAIM_JOB,
+        1,
+        _status_key(user_id),
+        time.time(),
+        DELETE_HEARTBEAT_TIMEOUT,
+        datetime.now().isoformat(),
+        DELETE_STATUS_TTL,
+    )
+    return bool(claimed), await status(user_id)
+
+
+async def _keep_alive(user_id: str):
+    # Refresh the heartbeat while the job runs, until cancelled once it's done.
+    while True:
+        await _set_status(user_id, heartbeat=time.time())
+        await asyncio.sleep(DELETE_HEARTBEAT_TIMEOUT / 3)
+
+
+async def delete_user_data(user_id: str) -> dict:
+    """
+    Delete everything stored for user_id in bounded batches, each in its own transaction.
+    Safe to re-run after a failure. Returns the number of rows deleted per table.
+    """
+    counts = {table: 0 for table, _ in _batches(user_id, DELETE_BATCH_SIZE)}
+    await _set_status(user_id, status="running", started_at=datetime.now().isoformat(), **counts)
+    heartbeat = asyncio.create_task(_keep_alive(user_id))
+    try:
+        for table, statement in _batches(user_id, DELETE_BATCH_SIZE):
+            while True:
+                async with AsyncSessionLocal() as session:
+                    result = await session.execute(statement)
+                    await session.commit()
+                counts[table] += result.rowcount
+                await _set_status(user_id, **{table: counts[table]})
+                if result.rowcount < DELETE_BATCH_SIZE:
+                    break
+        await accounts.invalidate_user(user_id)
+    except Exception as e:
+        await _set_status(user_id, status="failed", error=repr(e))
+        raise
+    finally:
+        heartbeat.cancel()
+    await _set_status(user_id, status="done", finished_at=datetime.now().isoformat())
+    return counts
+
+
+async def run(user_id: str):
+    """
+    Background-task entry point: failures are recorded in the job status.
+    """
+    try:
+        await delete_user_data(user_id)
+    except Exception as e:
+        print(f"deletion for {user_id} failed:", e)
@@ -0,0 +1,110 @@
+import asyncio
+import os
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+import metrics
+
+load_dotenv()
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_DEFAULT_CONCURRENCY = int(os.getenv("LLM_DEFAULT_CONCURRENCY", "32"))
+
+# Max in-flight requests per model; anything not listed uses the default.
+MODEL_CONCURRENCY = {
+    "gpt-4o": int(os.getenv("LLM_CONCURRENCY_GPT_4O", "48")),
+    "gpt-4-turbo": int(os.getenv("LLM_CONCURRENCY_GPT_4_TURBO", "16")),
+    "omni-moderation-latest": int(os.getenv("LLM_CONCURRENCY_MODERATION", "64")),
+}
+
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+    ),
+    timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+)
+
+client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=http_client,
+    max_retries=LLM_MAX_RETRIES,
+    timeout=LLM_TIMEOUT,
+)
+
+_semaphores = {}
+
+
+def _limit(model: str) -> asyncio.Semaphore:
+    semaphore = _semaphores.get(model)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(
+            MODEL_CONCURRENCY.get(model, LLM_DEFAULT_CONCURRENCY)
+        )
+        _semaphores[model] = semaphore
+    return semaphore
+
+
+async def chat(messages: list, model: str = "gpt-4o", timeout: float = None, **kwargs) -> str:
+    """
+    Run a chat completion and return the message content.
+    """
+    endpoint = metrics.current_endpoint.get()
+    async with _limit(model), metrics.timed(
+        metrics.LLM_REQUESTS, model=model, endpoint=endpoint, operation="chat"
+    ):
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            timeout=timeout or LLM_TIMEOUT,
+            **kwargs,
+        )
+    metrics.record_llm_usage(model, response.usage)
+    return response.choices[0].message.content
+
+
+async def stream_chat(messages: list, model: str = "gpt-4o", timeout: float = None, **kwargs):
+    """
+    Run a streaming chat completion and yield content deltas as they arrive.
+    """
+    endpoint = metrics.current_endpoint.get()
+    # The last chunk then carries the token usage, with no choices.
+    kwargs.setdefault("stream_options", {"include_usage": True})
+    async with _limit(model), metrics.timed(
+        metrics.LLM_REQUESTS, model=model, endpoint=endpoint, operation="stream"
+    ):
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            timeout=timeout or LLM_TIMEOUT,
+            **kwargs,
+        )
+        async for chunk in stream:
+            if chunk.usage:
+                metrics.record_llm_usage(model, chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+async def moderate(text: str, model: str = "omni-moderation-latest", timeout: float = None) -> bool:
+    """
+    Return True if the moderation endpoint flags the text.
+    """
+    endpoint = metrics.current_endpoint.get()
+    async with _limit(model), metrics.timed(
+        metrics.LLM_REQUESTS, model=model, endpoint=endpoint, operation="moderation"
+    ):
+        response = await client.moderations.create(
+            model=model, input=text, timeout=timeout or LLM_TIMEOUT
+        )
+    return response.results[0].flagged
+
+
+async def close():
+    await client.close()
@@ -0,0 +1,279 @@
+"""
+Local stand-ins for the external services, used by loadtest.py.
+
+- services_app(): one FastAPI app serving the OpenAI chat completion (plain and streamed)
+  and moderation endpoints and the Stripe checkout, product and price endpoints.
+- FakeFirestore: in-memory async stand-in for the Firestore client used by accounts.py.
+- id_token(uid): an unsigned ID token, accepted by firebase_admin in emulator mode.
+
+Every latency is drawn from a seeded lognormal distribution given as "median_ms:sigma".
+"""
+import asyncio
+import base64
+import json
+import math
+import random
+import time
+from uuid import uuid4
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from google.api_core.exceptions import NotFound
+
+import prompts
+
+WORDS = (
+    "grace peace prayer hope mercy faith love patience trust light rest heart "
+    "strength joy wisdom spirit gentle quiet steadfast kindness"
+).split()
+
+
+class Latency:
+    """
+    Lognormal latency around a median, e.g. Latency.parse("400:0.5").
+    """
+
+    def __init__(self, median_ms: float, sigma: float = 0.0):
+        self.median_ms = median_ms
+        self.sigma = sigma
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        median, _, sigma = spec.partition(":")
+        return cls(float(median), float(sigma or 0))
+
+    def sample(self, rng: random.Random) -> float:
+        """Seconds."""
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms * math.exp(self.sigma * rng.gauss(0, 1)) / 1000
+
+    def __str__(self):
+        return f"{self.median_ms:g}:{self.sigma:g}"
+
+
+def id_token(uid: str, project_id: str = "demo-rysen") -> str:
+    """
+    An unsigned Firebase ID token for uid. Only valid against the Auth emulator.
+    """
+
+    def part(data: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+    now = int(time.time())
+    claims = {
+        "iss": f"https://securetoken.google.com/{project_id}",
+        "aud": project_id,
+        "auth_time": now,
+        "iat": now,
+        "exp": now + 24 * 3600,
+        "sub": uid,
+        "user_id": uid,
+        "firebase": {"sign_in_provider": "custom", "identities": {}},
+    }
+    return f"{part({'alg': 'none', 'typ': 'JWT'})}.{part(claims)}."
+
+
+def _text(rng: random.Random, tokens: int) -> str:
+    # One word stands in for one token.
+    return " ".join(rng.choice(WORDS) for _ in range(tokens)).capitalize() + "."
+
+
+def _completion_text(rng: random.Random, messages: list, tokens: int) -> str:
+    """
+    A reply in the format the prompt asks for: JSON with follow-ups, text with the
+    follow-ups marker, or plain text.
+    """
+    prompt = "\n".join(str(m.get("content", "")) for m in messages)
+    follow_ups = [_text(rng, 4), _text(rng, 4)]
+    if prompts.FOLLOW_UPS_MARKER in prompt:
+        return f"{_text(rng, tokens)}\n{prompts.FOLLOW_UPS_MARKER}{json.dumps(follow_ups)}"
+    if '"follow_ups"' in prompt:
+        return json.dumps({"answer": _text(rng, tokens), "follow_ups": follow_ups})
+    return _text(rng, tokens)
+
+
+def services_app(
+    seed: int = 1,
+    llm_ttft: Latency = Latency(400, 0.5),
+    llm_tokens: int = 200,
+    llm_tokens_per_sec: float = 60.0,
+    moderation: Latency = Latency(150, 0.3),
+    flagged_rate: float = 0.0,
+    stripe: Latency = Latency(250, 0.3),
+) -> FastAPI:
+    """
+    The OpenAI and Stripe stand-in. A completion waits a time-to-first-token, then emits
+    its tokens at llm_tokens_per_sec; max_tokens caps the reply length.
+    """
+    app = FastAPI()
+    rng = random.Random(seed)
+    # Streamed tokens are sent in chunks at most this often, to keep the fake itself cheap.
+    chunk_interval = 0.05
+
+    def usage(messages: list, completion_tokens: int) -> dict:
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        tokens = max(1, int(rng.gauss(llm_tokens, llm_tokens / 4)))
+        if body.get("max_tokens"):
+            tokens = min(tokens, body["max_tokens"])
+        content = _completion_text(rng, messages, tokens)
+        ttft = llm_ttft.sample(rng)
+        completion_id = f"chatcmpl-{uuid4().hex}"
+        model = body.get("model", "gpt-4o")
+
+        if not body.get("stream"):
+            await asyncio.sleep(ttft + tokens / llm_tokens_per_sec)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage(messages, tokens),
+            }
+
+        def chunk(delta: dict, finish_reason=None, choices=True) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+                if choices
+                else [],
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        async def events():
+            await asyncio.sleep(ttft)
+            yield chunk({"role": "assistant", "content": ""})
+            words = content.split(" ")
+            per_chunk = max(1, int(llm_tokens_per_sec * chunk_interval))
+            for i in range(0, len(words), per_chunk):
+                text = " ".join(words[i : i + per_chunk])
+                yield chunk({"content": text if i == 0 else " " + text})
+                await asyncio.sleep(len(words[i : i + per_chunk]) / llm_tokens_per_sec)
+            yield chunk({}, finish_reason="stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                data = json.loads(chunk({}, choices=False)[len("data: ") :])
+                data["usage"] = usage(messages, tokens)
+                yield f"data: {json.dumps(data)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/moderations")
+    async def moderations(request: Request):
+        body = await request.json()
+        await asyncio.sleep(moderation.sample(rng))
+        flagged = rng.random() < flagged_rate
+        return {
+            "id": f"modr-{uuid4().hex}",
+            "model": body.get("model", "omni-moderation-latest"),
+            "results": [{"flagged": flagged, "categories": {}, "category_scores": {}}],
+        }
+
+    def stripe_object(kind: str, prefix: str, **fields) -> dict:
+        return {"id": f"{prefix}_{uuid4().hex[:24]}", "object": kind, "livemode": False, **fields}
+
+    @app.post("/v1/checkout/sessions")
+    async def checkout_session():
+        await asyncio.sleep(stripe.sample(rng))
+        session = stripe_object("checkout.session", "cs_test")
+        session["url"] = f"https://checkout.stripe.test/c/pay/{session['id']}"
+        return session
+
+    @app.post("/v1/products")
+    async def product():
+        await asyncio.sleep(stripe.sample(rng))
+        return stripe_object("product", "prod")
+
+    @app.post("/v1/prices")
+    async def price():
+        await asyncio.sleep(stripe.sample(rng))
+        return stripe_object("price", "price")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+class _Snapshot:
+    def __init__(self, data):
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _Document:
+    def __init__(self, store: "FakeFirestore", path: tuple):
+        self.store = store
+        self.path = path
+
+    async def get(self, *args, **kwargs):
+        await self.store.wait()
+        return _Snapshot(self.store.docs.get(self.path))
+
+    async def set(self, data: dict, merge: bool = False, **kwargs):
+        await self.store.wait()
+        current = self.store.docs.get(self.path) if merge else None
+        self.store.docs[self.path] = {**(current or {}), **data}
+
+    async def update(self, data: dict, **kwargs):
+        await self.store.wait()
+        if self.path not in self.store.docs:
+            raise NotFound(f"No document to update: {'/'.join(self.path)}")
+        self.store.docs[self.path].update(data)
+
+    async def delete(self, **kwargs):
+        await self.store.wait()
+        self.store.docs.pop(self.path, None)
+
+
+class _Collection:
+    def __init__(self, store: "FakeFirestore", name: str):
+        self.store = store
+        self.name = name
+
+    def document(self, document_id: str) -> _Document:
+        return _Document(self.store, (self.name, document_id))
+
+
+class FakeFirestore:
+    """
+    In-memory Firestore covering collection().document() get/set/update/delete.
+    Each call waits a sampled latency. Data lives only as long as the process.
+    """
+
+    def __init__(self, latency: Latency = Latency(0), seed: int = 1):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.docs = {}
+
+    async def wait(self):
+        delay = self.latency.sample(self.rng)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def collection(self, name: str) -> _Collection:
+        return _Collection(self, name)
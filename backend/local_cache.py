@@ -0,0 +1,71 @@
+import asyncio
+import os
+from uuid import uuid4
+
+from cachetools import TTLCache
+
+L1_CACHE_SIZE = int(os.getenv("L1_CACHE_SIZE", "2048"))
+L1_CACHE_TTL = float(os.getenv("L1_CACHE_TTL", "300"))
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Lets a worker ignore its own invalidations.
+WORKER_ID = uuid4().hex
+
+_cache = TTLCache(maxsize=L1_CACHE_SIZE, ttl=L1_CACHE_TTL)
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def get(key: str):
+    value = _cache.get(key)
+    if value is None:
+        _stats["misses"] += 1
+    else:
+        _stats["hits"] += 1
+    return value
+
+
+def put(key: str, value):
+    if value is not None:
+        _cache[key] = value
+
+
+def evict(key: str):
+    _cache.pop(key, None)
+
+
+def clear():
+    _cache.clear()
+
+
+def stats() -> dict:
+    return {**_stats, "size": len(_cache), "maxsize": _cache.maxsize}
+
+
+async def publish_invalidation(redis, key: str):
+    await redis.publish(INVALIDATION_CHANNEL, f"{WORKER_ID}|{key}")
+
+
+async def listen_for_invalidations(redis):
+    """
+    Evict keys written by other workers. Runs for the lifetime of the app.
+    """
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Invalidations may have been missed while we were not subscribed.
+            clear()
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                origin, _, key = message["data"].partition("|")
+                if origin != WORKER_ID:
+                    evict(key)
+                    _stats["invalidations"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print("cache invalidation listener error:", e)
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.close()
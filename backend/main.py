@@ -1,16 +1,16 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Header
+from fastapi import FastAPI, Depends, HTTPException, status, Header, Response
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, List
 from datetime import datetime
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials
 from firebase_admin import auth as firebase_auth
 import stripe
 import os
 from routers import chat_router
 import models
-from db import engine
+from db import engine, migrate, pool_stats
 # from routers import chat  # Make sure the import path is correct
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
@@ -22,7 +22,18 @@ from fastapi_cache.decorator import cache
 from sqlalchemy.ext.asyncio import AsyncSession
 from crud import get_reading_by_date, save_reading
 import asyncio
-from utils import fetch_daily_data
+import prefetch
+import local_cache
+from cache import redis as redis_client
+import utils
+import llm
+import prompts
+import accounts
+import unit_of_work
+import analytics
+import partitions
+import metrics
+import timing
 from fastapi_cache.backends.redis import RedisBackend
 import redis.asyncio as redis
 from datetime import timezone
@@ -33,28 +44,61 @@ from zoneinfo import ZoneInfo
 scheduler = AsyncIOScheduler(timezone=ZoneInfo("Pacific/Kiritimati"))  # Set to Kiritimati time zone
 
 # Initialize Firebase
-cred = credentials.Certificate("ryenapp.json")  # Replace with your service account key
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+if os.getenv("FIREBASE_AUTH_EMULATOR_HOST"):
+    # Emulator (local runs and load tests): ID tokens are not signature-checked, no key needed.
+    firebase_admin.initialize_app(options={"projectId": os.getenv("FIREBASE_PROJECT_ID", "demo-rysen")})
+else:
+    cred = credentials.Certificate("ryenapp.json")  # Replace with your service account key
+    firebase_admin.initialize_app(cred)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Load data on startup
     
     # scheduler.add_job(fetch_daily_data, "interval", seconds=60)
-    scheduler.add_job(fetch_daily_data, "cron", hour=0, minute=1)
-    scheduler.start()
-    # Startup: create tables if they don't exist
-    async with engine.begin() as conn:
-        await conn.run_sync(models.Base.metadata.create_all)
+    # PREFETCH_DAYS=0 turns prefetching off (e.g. for load tests without network access).
+    if prefetch.PREFETCH_DAYS:
+        scheduler.add_job(prefetch.prefetch_horizon, "cron", hour=0, minute=1)
+        # Re-run through the day (and once at startup) to fill any gaps left by failed runs.
+        scheduler.add_job(
+            prefetch.prefetch_horizon,
+            "interval",
+            hours=prefetch.PREFETCH_INTERVAL_HOURS,
+            next_run_time=datetime.now(ZoneInfo("Pacific/Kiritimati")),
+        )
+    # Startup: bring the schema up to the latest migration
+    await migrate()
+
+    try:
+        await partitions.maintain()
+    except Exception as e:
+        # Rows for a missing month fall into the default partition; the daily run retries.
+        print("partition maintenance at startup failed:", e)
+    scheduler.add_job(partitions.maintain, "cron", hour=0, minute=5)
+    scheduler.add_job(
+        utils.flush_segment_hits, "interval", seconds=utils.SEGMENT_HITS_FLUSH_INTERVAL
+    )
+    analytics.start()
 
     # Init Redis cache
-    redis = aioredis.from_url("redis://redis:6379", encoding="utf8", decode_responses=True)
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+    FastAPICache.init(RedisBackend(redis_client), prefix="fastapi-cache")
+    invalidation_listener = asyncio.create_task(local_cache.listen_for_invalidations(redis_client))
+    writer = asyncio.create_task(unit_of_work.run_writer()) if unit_of_work.WRITE_BEHIND else None
     # redis_backend = RedisBackend(redis.from_url("redis://localhost"))
     # FastAPICache.init(redis_backend)
 
+    # Start jobs only once the tables and cache backend they use are ready.
+    scheduler.start()
+    print("prompt template versions:", prompts.versions())
+
     yield
     scheduler.shutdown()
+    invalidation_listener.cancel()
+    if writer:
+        writer.cancel()
+    await analytics.stop()
+    await utils.flush_segment_hits()
+    await llm.close()
+    await utils.http_client.aclose()
 
 app = FastAPI(title="RYSEN Backend", lifespan=lifespan)
 
@@ -65,10 +109,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(timing.ServerTimingMiddleware)
+# Added last so it runs first and sets the endpoint the inner middleware logs.
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine)
+metrics.register_stats("db_pool", pool_stats)
+metrics.register_stats("l1_cache", local_cache.stats)
+metrics.register_stats("analytics", analytics.stats)
 
 load_dotenv()
 
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+# Points Stripe calls at a stand-in (see loadtest.py); unset in production.
+stripe.api_base = os.getenv("STRIPE_API_BASE", stripe.api_base)
 FRONTEND_URL = os.getenv("FRONTEND_URL")
 
 predefined_recurring_prices = {
@@ -102,13 +155,13 @@ class OnboardingData(BaseModel):
     spiritualGoals: Optional[List[str]]
     avatar: Optional[str]  # key from avatarOptions
 
-def verify_firebase_token(authorization: Optional[str] = Header(None)):
+async def verify_firebase_token(authorization: Optional[str] = Header(None)):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     id_token = authorization.split(" ")[1]
     try:
-        decoded_token = firebase_auth.verify_id_token(id_token)
+        decoded_token = await accounts.verify_token(id_token)
         return decoded_token["uid"]
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -119,14 +172,13 @@ app.include_router(chat_router.router)
 @app.post("/auth/signup")
 async def signup(data: TokenRequest):
     try:
-        decoded_token = firebase_auth.verify_id_token(data.id_token)
+        decoded_token = await accounts.verify_token(data.id_token)
         uid = decoded_token["uid"]
         email = decoded_token.get("email", "")
         name = decoded_token.get("name", "")
-        user_ref = db.collection("users").document(uid)
-        user_doc = user_ref.get()
+        existing = await accounts.fetch_user(uid)
 
-        if user_doc.exists:
+        if existing is not None:
             raise HTTPException(
                 status_code=400, detail="User already exists. Use /signin instead."
             )
@@ -143,7 +195,7 @@ async def signup(data: TokenRequest):
             "created_at": datetime.utcnow(),
         }
 
-        user_ref.set(user_data)
+        await accounts.set_user(uid, user_data)
 
         return {
             "message": "Signup successful",
@@ -164,15 +216,14 @@ async def signup(data: TokenRequest):
 @app.post("/auth/signin")
 async def signin(data: TokenRequest):
     try:
-        decoded_token = firebase_auth.verify_id_token(data.id_token)
+        decoded_token = await accounts.verify_token(data.id_token)
         uid = decoded_token["uid"]
         email = decoded_token.get("email", "")
         name = decoded_token.get("name", "")
-        print("decoded_token==>", decoded_token, uid, email)
-        user_ref = db.collection("users").document(uid)
-        user_doc = user_ref.get()
+        # Read Firestore directly: login_count must not come from a cached profile.
+        user_data = await accounts.fetch_user(uid)
          
-        if not user_doc.exists:
+        if user_data is None:
             user_data = {
                 "uid": uid,
                 "name": name,
@@ -185,7 +236,7 @@ async def signin(data: TokenRequest):
                 "created_at": datetime.utcnow(),
             }
 
-            user_ref.set(user_data)
+            await accounts.set_user(uid, user_data)
             return {
                 "message": "Signin successful",
                 "uid": uid,
@@ -198,10 +249,9 @@ async def signin(data: TokenRequest):
                 "onboarded": user_data.get("onboarded", False),
             }
 
-        user_data = user_doc.to_dict()
         login_count = user_data.get("login_count", 0) + 1
         name = user_data.get("name", "")
-        user_ref.update({"login_count": login_count, "last_login": datetime.utcnow()})
+        await accounts.update_user(uid, {"login_count": login_count, "last_login": datetime.utcnow()})
         uid = user_data.get("uid", "")
         theme = user_data.get("theme", "light")
         avatar = user_data.get("avatar", "Thérèse")
@@ -223,10 +273,8 @@ async def signin(data: TokenRequest):
         raise HTTPException(status_code=401, detail=f"Invalid token or error: {e}")
 
 @app.post("/onboarding")
-def save_onboarding(data: OnboardingData, uid: str = Depends(verify_firebase_token)):
-    user_ref = db.collection("users").document(uid)
-
-    user_ref.set({
+async def save_onboarding(data: OnboardingData, uid: str = Depends(verify_firebase_token)):
+    await accounts.set_user(uid, {
         "name": data.name if data.name is not None else "",
         "age_range": data.ageRange if data.ageRange is not None else "",
         "sex": data.sex if data.sex is not None else "",
@@ -242,7 +290,6 @@ def save_onboarding(data: OnboardingData, uid: str = Depends(verify_firebase_tok
 @app.post("/donate")
 def create_donation_session(data: DonationRequest):
     try:
-        print("entered here", data.amount)
         if data.recurring:
             if data.amount in predefined_recurring_prices:
                 # Use pre-created Stripe price
@@ -272,7 +319,6 @@ def create_donation_session(data: DonationRequest):
                     "quantity": 1,
                 }
             ]
-        print("works before creating session", line_items)
         session = stripe.checkout.Session.create(
             payment_method_types=["card"],
             mode="subscription" if data.recurring else "payment",
@@ -285,10 +331,18 @@ def create_donation_session(data: DonationRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+@app.get("/health/db")
+async def db_health():
+    return pool_stats()
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/user/{uid}")
-def get_user(uid: str):
-    user_ref = db.collection("users").document(uid)
-    doc = user_ref.get()
-    if not doc.exists:
+async def get_user(uid: str):
+    user = await accounts.get_user(uid)
+    if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return doc.to_dict()
+    return user
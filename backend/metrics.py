@@ -0,0 +1,178 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from starlette.routing import Match
+
+# Route template of the request being handled, e.g. "/chat/message", used to label
+# downstream calls. Background tasks inherit it from the request that started them.
+current_endpoint = ContextVar("current_endpoint", default="background")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HTTP_REQUESTS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency.",
+    ["method", "endpoint", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled.")
+
+LLM_REQUESTS = Histogram(
+    "llm_request_duration_seconds",
+    "OpenAI call latency (for streams, until the last chunk).",
+    ["model", "endpoint", "operation", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "OpenAI tokens used.", ["model", "endpoint", "kind"]
+)
+
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Cache lookups by key namespace.", ["namespace", "result"]
+)
+CACHE_OPERATIONS = Histogram(
+    "cache_operation_duration_seconds",
+    "Redis cache call latency.",
+    ["namespace", "operation", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_QUERIES = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement latency.",
+    ["statement"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection.", buckets=LATENCY_BUCKETS
+)
+
+EXTERNAL_CALLS = Histogram(
+    "external_call_duration_seconds",
+    "Latency of calls to external services.",
+    ["service", "operation", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def namespace(key: str) -> str:
+    return key.split(":", 1)[0] if ":" in key else "other"
+
+
+@asynccontextmanager
+async def timed(histogram: Histogram, **labels):
+    """
+    Observe the duration of the block, labelled with outcome "ok", "error" or "cancelled".
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except (asyncio.CancelledError, GeneratorExit):
+        outcome = "cancelled"
+        raise
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(time.perf_counter() - start)
+
+
+def record_llm_usage(model: str, usage):
+    if usage is None:
+        return
+    endpoint = current_endpoint.get()
+    LLM_TOKENS.labels(model, endpoint, "prompt").inc(usage.prompt_tokens or 0)
+    LLM_TOKENS.labels(model, endpoint, "completion").inc(usage.completion_tokens or 0)
+
+
+class StatsCollector:
+    """
+    Exposes the numeric fields of a stats() dict as gauges, read at scrape time.
+    """
+
+    def __init__(self, prefix: str, stats):
+        self.prefix = prefix
+        self.stats = stats
+
+    def collect(self):
+        for field, value in self.stats().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield GaugeMetricFamily(f"{self.prefix}_{field}", f"{self.prefix} {field}.", value)
+
+
+def register_stats(prefix: str, stats):
+    REGISTRY.register(StatsCollector(prefix, stats))
+
+
+def instrument_engine(engine):
+    """
+    Time every statement run through the given async engine.
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop()
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERIES.labels(kind).observe(time.perf_counter() - start)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+
+def endpoint_for(scope) -> str:
+    # The route template rather than the raw path, so ids don't become label values.
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency (until the last body chunk, so streamed
+    responses are timed in full) and setting current_endpoint for the request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        endpoint = endpoint_for(scope)
+        token = current_endpoint.set(endpoint)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            HTTP_REQUESTS.labels(scope["method"], endpoint, str(status)).observe(
+                time.perf_counter() - start
+            )
+            current_endpoint.reset(token)
+
+
+def render() -> tuple:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,95 @@
+"""
+Smoke check for the Prometheus instrumentation.
+
+Calls the instrumented code paths for real: the Redis cache (set, local hit, Redis hit,
+miss), Firestore reads and writes (against the in-memory stand-in from loadtest_fakes),
+and OpenAI chat, streamed chat and moderation (against the fake OpenAI app, in-process).
+Then checks that each one produced its series in the /metrics output. A histogram whose
+labels don't match what the code passes fails here instead of in a request handler.
+
+    REDIS_URL=redis://localhost:6379 python metrics_check.py
+
+Only Redis is used; DATABASE_URL and AES_SECRET_KEY just have to be set for the imports.
+Exits non-zero if a call fails or a series is missing.
+"""
+import asyncio
+import os
+import sys
+from uuid import uuid4
+
+import httpx
+from openai import AsyncOpenAI
+
+# llm builds its client at import; the check swaps in one for the fake below.
+os.environ.setdefault("OPENAI_API_KEY", "metrics-check")
+
+import accounts
+import llm
+import local_cache
+import loadtest_fakes
+import metrics
+import utils
+from cache import redis
+
+EXPECTED = [
+    'cache_operation_duration_seconds_count{namespace="metricscheck",operation="set",outcome="ok"}',
+    'cache_operation_duration_seconds_count{namespace="metricscheck",operation="get",outcome="ok"}',
+    'cache_lookups_total{namespace="metricscheck",result="local_hit"}',
+    'cache_lookups_total{namespace="metricscheck",result="redis_hit"}',
+    'cache_lookups_total{namespace="metricscheck",result="miss"}',
+    'external_call_duration_seconds_count{operation="set_user",outcome="ok",service="firestore"}',
+    'external_call_duration_seconds_count{operation="get_user",outcome="ok",service="firestore"}',
+    'llm_request_duration_seconds_count{endpoint="metrics_check",model="gpt-4o",operation="chat",outcome="ok"}',
+    'llm_request_duration_seconds_count{endpoint="metrics_check",model="gpt-4o",operation="stream",outcome="ok"}',
+    'llm_request_duration_seconds_count{endpoint="metrics_check",model="omni-moderation-latest",operation="moderation",outcome="ok"}',
+    'llm_tokens_total{endpoint="metrics_check",kind="completion",model="gpt-4o"}',
+]
+
+
+async def exercise():
+    key = f"metricscheck:{uuid4().hex}"
+    await utils.set_cache(key, {"value": 1})
+    assert await utils.get_cache(key) == {"value": 1}, "local cache miss after set"
+    local_cache.evict(key)
+    assert await utils.get_cache(key) == {"value": 1}, "Redis cache miss after set"
+    assert await utils.get_cache(f"{key}:missing") is None
+    await redis.delete(key)
+
+    accounts._db = loadtest_fakes.FakeFirestore()
+    uid = f"metricscheck-{uuid4().hex}"
+    await accounts.set_user(uid, {"name": "check"}, merge=True)
+    assert await accounts.fetch_user(uid) == {"name": "check"}
+
+    fake_openai = loadtest_fakes.services_app(
+        llm_ttft=loadtest_fakes.Latency(0),
+        llm_tokens=5,
+        llm_tokens_per_sec=1000,
+        moderation=loadtest_fakes.Latency(0),
+    )
+    llm.client = AsyncOpenAI(
+        api_key="metrics-check",
+        base_url="http://fake-openai/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_openai)),
+    )
+    token = metrics.current_endpoint.set("metrics_check")
+    try:
+        messages = [{"role": "user", "content": "Hello"}]
+        assert await llm.chat(messages)
+        assert "".join([chunk async for chunk in llm.stream_chat(messages)])
+        assert await llm.moderate("Hello") is False
+    finally:
+        metrics.current_endpoint.reset(token)
+
+
+def main():
+    asyncio.run(exercise())
+    output = metrics.render()[0].decode()
+    missing = [series for series in EXPECTED if series not in output]
+    for series in missing:
+        print("missing:", series)
+    print(f"{len(EXPECTED) - len(missing)}/{len(EXPECTED)} series present")
+    sys.exit(1 if missing else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, ForeignKey, Boolean, TIMESTAMP, func, Date
+from sqlalchemy import Column, String, Text, Boolean, TIMESTAMP, func, Date, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY
 from sqlalchemy.ext.declarative import declarative_base
 import uuid
@@ -7,28 +7,51 @@ Base = declarative_base()
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    # Range-partitioned by month on created_at, so the partition key is part of the primary key.
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(String, nullable=False)
     topic = Column(Text)
-    summary = Column(Text)
-    created_at = Column(TIMESTAMP, server_default=func.now())
+    summary = Column(Text)  # encrypted rolling summary, see context.py
+    # Timestamp of the newest message folded into summary.
+    summary_until = Column(TIMESTAMP)
+    created_at = Column(TIMESTAMP, primary_key=True, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_chat_sessions_user_topic_created", "user_id", "topic", "created_at"),
+        # Keyset pagination of a user's recent chats (list_sessions).
+        Index(
+            "ix_chat_sessions_user_chat_recent",
+            "user_id", created_at.desc(), id.desc(),
+            postgresql_where=topic == "chat",
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
 class Message(Base):
     __tablename__ = "messages"
+    # Range-partitioned by month on timestamp. Partitioned tables can't be the target of a
+    # foreign key on id alone, so chat_session_id is unconstrained (see deletion.py).
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    chat_session_id = Column(UUID(as_uuid=True), ForeignKey("chat_sessions.id", ondelete="CASCADE"))
+    chat_session_id = Column(UUID(as_uuid=True))
     sender = Column(String(10))
     text = Column(Text)  # encrypted
-    timestamp = Column(TIMESTAMP, server_default=func.now())
+    timestamp = Column(TIMESTAMP, primary_key=True, server_default=func.clock_timestamp())
+
+    __table_args__ = (
+        Index("ix_messages_session_timestamp", "chat_session_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
 class Feedback(Base):
     __tablename__ = "feedback"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    message_id = Column(UUID(as_uuid=True), ForeignKey("messages.id", ondelete="CASCADE"))
+    message_id = Column(UUID(as_uuid=True))
     user_email = Column(Text)
     reaction = Column(Text)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+    __table_args__ = (Index("ix_feedback_message_id", "message_id"),)
+
 class FlaggedResponse(Base):
     __tablename__ = "flagged_responses"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -39,6 +62,8 @@ class FlaggedResponse(Base):
     review_notes = Column(Text)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+    __table_args__ = (Index("ix_flagged_responses_message_id", "message_id"),)
+
 
 class MassReading(Base):
     __tablename__ = "mass_readings"
@@ -59,4 +84,19 @@ class PastoralMemory(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(String, nullable=False, unique=True)
     themes = Column(ARRAY(String))  # up to 3 active themes
-    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+class AnalyticsEvent(Base):
+    __tablename__ = "analytics_events"
+
+    # Range-partitioned by month on created_at, so the partition key is part of the primary key.
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    created_at = Column(TIMESTAMP, primary_key=True, server_default=func.now())
+    user_id = Column(String)
+    event_type = Column(Text, nullable=False)
+    data = Column(JSONB)
+
+    __table_args__ = (
+        Index("ix_analytics_events_user_created", "user_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
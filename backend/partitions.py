@@ -0,0 +1,134 @@
+import os
+import re
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from db import engine
+
+# Monthly partitions are created this many months ahead of the current one.
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "2"))
+# Months of history kept per table; 0 keeps everything.
+CHAT_RETENTION_MONTHS = int(os.getenv("CHAT_RETENTION_MONTHS", "0"))
+ANALYTICS_RETENTION_MONTHS = int(os.getenv("ANALYTICS_RETENTION_MONTHS", "12"))
+# "detach" leaves expired partitions as standalone tables to archive; "drop" deletes them.
+RETENTION_ACTION = os.getenv("RETENTION_ACTION", "detach").lower()
+# Arbitrary key for the advisory lock that serializes partition DDL across workers.
+PARTITION_LOCK_ID = 726514
+
+# Monthly range-partitioned tables: partition key and retention in months.
+PARTITIONED_TABLES = {
+    "chat_sessions": ("created_at", CHAT_RETENTION_MONTHS),
+    "messages": ("timestamp", CHAT_RETENTION_MONTHS),
+    "analytics_events": ("created_at", ANALYTICS_RETENTION_MONTHS),
+}
+
+
+def month_start(day: date, offset: int = 0) -> date:
+    month = day.month - 1 + offset
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table: str, start: date) -> str:
+    return f"{table}_{start:%Y_%m}"
+
+
+async def create_partition(conn, table: str, key: str, start: date, end: date) -> int:
+    """
+    Create the partition of table for [start, end) unless it exists. Rows that landed in
+    the default partition for that range would make CREATE ... PARTITION OF fail, so they
+    are moved out first and put back once the partition exists. Returns the rows moved.
+    """
+    name = partition_name(table, start)
+
+    async def exists(relation: str) -> bool:
+        result = await conn.execute(text("SELECT to_regclass(:name)"), {"name": relation})
+        return result.scalar() is not None
+
+    if await exists(name):
+        return 0
+    moved = 0
+    if await exists(f"{table}_default"):
+        await conn.execute(text(f"CREATE TEMP TABLE _moved (LIKE {table}) ON COMMIT DROP"))
+        result = await conn.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {table}_default "
+                f"WHERE \"{key}\" >= '{start}' AND \"{key}\" < '{end}' RETURNING *) "
+                "INSERT INTO _moved SELECT * FROM moved"
+            )
+        )
+        moved = result.rowcount
+    await conn.execute(
+        text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')")
+    )
+    if moved:
+        await conn.execute(text(f"INSERT INTO {table} SELECT * FROM _moved"))
+    return moved
+
+
+async def expired_partitions(conn, table: str, months: int) -> list:
+    """
+    The partitions of table that end before the retention window. The default partition
+    is never included.
+    """
+    cutoff = month_start(date.today(), -months)
+    result = await conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:table)"
+        ),
+        {"table": table},
+    )
+    expired = []
+    for name, bound in result.all():
+        upper = re.search(r"TO \('([^']+)'\)", bound)
+        if upper and datetime.fromisoformat(upper.group(1)).date() <= cutoff:
+            expired.append(name)
+    return expired
+
+
+async def expire_partition(conn, table: str, name: str):
+    """
+    Detach (or drop) one partition of table. Returns its name.
+    """
+    await conn.execute(text(f'ALTER TABLE {table} DETACH PARTITION "{name}"'))
+    if RETENTION_ACTION == "drop":
+        await conn.execute(text(f'DROP TABLE "{name}"'))
+    return name
+
+
+async def _locked(description: str, work, *args):
+    """
+    Run work(conn, *args) in its own transaction, holding the partition lock. A failure is
+    logged and returns None, so the other steps of maintain() still run.
+    """
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": PARTITION_LOCK_ID})
+            return await work(conn, *args)
+    except Exception as e:
+        print(f"partition maintenance: {description} failed:", e)
+        return None
+
+
+async def maintain():
+    """
+    Create upcoming partitions and expire old ones for every partitioned table.
+    Runs at startup and daily. Each partition is created or expired in its own transaction.
+    """
+    today = date.today()
+    for table, (key, months) in PARTITIONED_TABLES.items():
+        for offset in range(PARTITION_MONTHS_AHEAD + 1):
+            start, end = month_start(today, offset), month_start(today, offset + 1)
+            name = partition_name(table, start)
+            moved = await _locked(f"creating {name}", create_partition, table, key, start, end)
+            if moved:
+                print(f"partitions: moved {moved} rows from {table}_default to {name}")
+        if not months:
+            continue
+        expired = await _locked(
+            f"listing expired {table} partitions", expired_partitions, table, months
+        )
+        for name in expired or []:
+            if await _locked(f"expiring {name}", expire_partition, table, name):
+                print(f"retention: {RETENTION_ACTION} partition {name} of {table}")
@@ -0,0 +1,273 @@
+import re
+
+PASTORAL_KEYWORDS = [
+    "anxiety",
+    "sin",
+    "fear",
+    "trust",
+    "forgiveness",
+    "grief",
+    "hope",
+    "suffering",
+    "joy",
+    "love",
+    "mercy",
+    "healing",
+    "health",
+    "illness",
+    "peace",
+    "faith",
+    "repentance",
+    "gratitude",
+    "humility",
+    "patience",
+    "financial",
+    "loss",
+    "guidance",
+    "courage",
+    "compassion",
+    "loneliness",
+    "despair",
+    "temptation",
+    "doubt",
+    "shame",
+    "guilt",
+    "anger",
+    "envy",
+    "pride",
+    "confession",
+    "eucharist",
+    "adoration",
+    "rosary",
+    "prayer",
+    "sacrament",
+    "lectio divina",
+    "divine mercy",
+    "fasting",
+    "penance",
+    "intercession",
+    "blessing",
+    "worship",
+    "work",
+    "family",
+    "family issues",
+    "friendship",
+    "marriage",
+    "vocation",
+    "community",
+    "service",
+    "charity",
+    "conversion",
+    "discernment",
+    "perseverance",
+    "detachment",
+    "spiritual dryness",
+    "zeal",
+    "obedience",
+    "thanksgiving",
+    "Hopeless cases",
+    "faithfulness",
+    "trust in providence",
+    "purity",
+    "simplicity",
+    "mary",
+    "saints",
+    "intercession of saints",
+    "self-worth",
+    "identity",
+    "purpose",
+    "calling",
+    "mission",
+    "strength",
+    "light",
+    "freedom",
+    "renewal",
+    "salvation",
+    "redemption",
+    "truth",
+    "wisdom",
+    "understanding",
+    "discouragement",
+    "vulnerability",
+    "acceptance",
+]
+
+PASTORAL_KEYWORD_SET = frozenset(keyword.lower() for keyword in PASTORAL_KEYWORDS)
+
+# Extra surface forms per theme. A trailing "*" matches any word ending (stem). Words with
+# an everyday sense ("ill at ease", "rent a flat", "saved money", "lent") only match in phrases.
+SYNONYMS = {
+    "anxiety": ["anxious*", "worr*", "panic*", "stress*", "overwhelm*", "nervous*",
+                # Longer than "i am ill", so the idiom isn't read as illness.
+                "ill at ease", "i am ill at ease", "i'm ill at ease"],
+    "sin": ["sinn*", "sinful", "sins"],
+    "fear": ["afraid", "scared", "fearful", "frighten*", "terrified"],
+    "trust": ["trusting", "trusted", "rely on god", "surrender*"],
+    "forgiveness": ["forgiv*", "pardon*"],
+    "grief": ["griev*", "mourn*", "bereave*", "passed away", "funeral"],
+    "hope": ["hopeful", "hoping"],
+    "suffering": ["suffer*", "in pain", "agony"],
+    "joy": ["joyful", "rejoic*", "happiness"],
+    "mercy": ["merciful"],
+    "healing": ["heal", "heals", "healed", "recover*"],
+    "health": ["healthy"],
+    "illness": ["i am ill", "i'm ill", "fell ill", "been ill", "very ill", "seriously ill",
+                "terminally ill", "mentally ill", "chronically ill",
+                "sick*", "disease*", "cancer", "diagnos*", "surgery", "hospital*"],
+    "peace": ["peaceful", "calm", "restless*"],
+    "faith": ["believ*"],
+    "repentance": ["repent*", "contrition", "contrite"],
+    "gratitude": ["grateful", "thankful"],
+    "humility": ["humble*"],
+    "patience": ["patient", "impatien*"],
+    "financial": ["financ*", "money", "debt*", "bills", "unemploy*", "lost my job", "mortgage",
+                  "pay the rent", "pay my rent", "pay rent", "afford rent", "afford the rent",
+                  "behind on rent"],
+    "loss": ["lost someone", "miscarriage"],
+    "guidance": ["guide me", "what should i do", "which path", "direction in life", "lost and confused"],
+    "courage": ["courageous", "brave*"],
+    "compassion": ["compassionate"],
+    "loneliness": ["lonely", "alone", "isolat*"],
+    "despair": ["despairing", "hopeless", "give up", "giving up"],
+    "temptation": ["tempt*", "addict*", "porn*", "lust*"],
+    "doubt": ["doubt*", "questioning god", "losing my faith"],
+    "shame": ["ashamed", "embarrass*"],
+    "guilt": ["guilty"],
+    "anger": ["angry", "furious", "resent*", "rage"],
+    "envy": ["envious", "jealous*"],
+    "pride": ["prideful", "arrogan*", "ego"],
+    "confession": ["confess*", "reconciliation"],
+    "eucharist": ["communion", "eucharistic", "holy mass", "going to mass"],
+    "adoration": ["adore"],
+    "rosary": ["rosaries", "hail mary", "hail marys"],
+    "prayer": ["pray", "praying", "prayers", "prayed"],
+    "sacrament": ["sacraments", "sacramental"],
+    "fasting": ["fast", "lenten", "during lent", "for lent", "this lent"],
+    "penance": ["penitent*"],
+    "intercession": ["intercede*", "pray for him", "pray for her", "pray for them"],
+    "blessing": ["blessed", "bless"],
+    "worship": ["worshipp*", "praise"],
+    "work": ["job", "career", "coworker*", "boss", "workplace"],
+    "family": ["my parents", "my mother", "my father", "my mom", "my dad", "my kids", "my children", "my son", "my daughter"],
+    "family issues": ["family conflict", "family problem*", "divorce*", "separated"],
+    "friendship": ["friend", "friends", "friendships"],
+    "marriage": ["married", "my husband", "my wife", "my spouse", "wedding", "engaged"],
+    "vocation": ["priesthood", "religious life", "seminary", "become a nun"],
+    "conversion": ["convert*", "coming back to the church", "return to the church"],
+    "discernment": ["discern*", "decision*"],
+    "perseverance": ["persever*", "keep going"],
+    "detachment": ["let go", "letting go", "attachment*"],
+    "spiritual dryness": ["dryness", "god feels distant", "god is silent", "can't feel god", "cannot feel god"],
+    "obedience": ["obey*", "obedient"],
+    "thanksgiving": ["thank god", "thank you lord", "thanks be to god"],
+    "hopeless cases": ["hopeless case", "impossible situation", "st. jude", "saint jude"],
+    "faithfulness": ["faithful"],
+    "trust in providence": ["providence", "god will provide", "god's plan", "gods plan"],
+    "purity": ["pure", "chastity", "chaste"],
+    "mary": ["our lady", "blessed mother", "virgin mary", "mother mary"],
+    "saints": ["saint", "patron saint"],
+    "intercession of saints": ["intercession of the saints", "pray to saints", "pray to the saints"],
+    "self-worth": ["self worth", "worthless", "not good enough", "self-esteem", "self esteem", "unlovable"],
+    "identity": ["who i am"],
+    "purpose": ["meaning of life", "meaningless", "pointless"],
+    "calling": ["called to"],
+    "freedom": ["free from"],
+    "renewal": ["renew*", "fresh start", "start over"],
+    "salvation": ["saved by", "be saved", "being saved", "get saved", "am i saved",
+                  "heaven", "eternal life"],
+    "redemption": ["redeem*"],
+    "wisdom": ["wise"],
+    "discouragement": ["discourag*", "disheartened", "defeated"],
+    "vulnerability": ["vulnerable"],
+    "acceptance": ["accept*"],
+}
+
+# Common words that only count as a theme when they come up more than once.
+WEAK_TERMS = frozenset(
+    ["love", "light", "work", "hope", "faith", "truth", "strength", "peace",
+     "prayer", "pray", "fast", "saint", "friend", "decision",
+     "accept", "accepted", "accepting", "calm", "wise", "praise", "bless",
+     "blessed", "job", "service", "mission", "understanding", "purpose"]
+)
+
+PHRASE_WEIGHT = 2.0
+TERM_WEIGHT = 1.0
+WEAK_WEIGHT = 0.5
+CONFIDENT_SCORE = 1.0
+
+
+_TOKEN = re.compile(r"[\w'-]+")
+
+
+def _tokens(text: str) -> tuple:
+    return tuple(_TOKEN.findall(text.lower().replace("’", "'")))
+
+
+def _build_tables():
+    terms = {}
+    for keyword in PASTORAL_KEYWORDS:
+        terms.setdefault(keyword.lower(), keyword.lower())
+    for theme, synonyms in SYNONYMS.items():
+        for synonym in synonyms:
+            terms.setdefault(synonym, theme)
+    exact = {}
+    stems = {}
+    for term, theme in terms.items():
+        words = _tokens(term.rstrip("*"))
+        if len(words) > 1 or "-" in words[0]:
+            weight = PHRASE_WEIGHT
+        elif words[0] in WEAK_TERMS:
+            weight = WEAK_WEIGHT
+        else:
+            weight = TERM_WEIGHT
+        if term.endswith("*"):
+            stems.setdefault(words, (theme, weight))
+        else:
+            exact.setdefault(words, (theme, weight))
+    max_words = max(len(words) for words in list(exact) + list(stems))
+    stem_lengths = sorted({len(words[-1]) for words in stems}, reverse=True)
+    return exact, stems, max_words, stem_lengths
+
+
+_EXACT, _STEMS, _MAX_WORDS, _STEM_LENGTHS = _build_tables()
+
+
+def _match_at(tokens: tuple, start: int):
+    # Longest phrase first so "trust in providence" wins over "trust", "divine mercy" over "mercy".
+    for size in range(min(_MAX_WORDS, len(tokens) - start), 0, -1):
+        words = tokens[start:start + size]
+        hit = _EXACT.get(words)
+        if hit:
+            return size, hit
+        last = words[-1]
+        for length in _STEM_LENGTHS:
+            if length <= len(last):
+                hit = _STEMS.get(words[:-1] + (last[:length],))
+                if hit:
+                    return size, hit
+    return 0, None
+
+
+def extract_local(text: str, limit: int = 2) -> list:
+    """
+    Match pastoral themes in text without a model call.
+    Returns up to `limit` themes that scored confidently, strongest first.
+    """
+    if not text:
+        return []
+    tokens = _tokens(text)
+    scores = {}
+    first_seen = {}
+    index = 0
+    while index < len(tokens):
+        size, hit = _match_at(tokens, index)
+        if not hit:
+            index += 1
+            continue
+        theme, weight = hit
+        scores[theme] = scores.get(theme, 0.0) + weight
+        first_seen.setdefault(theme, index)
+        index += size
+    confident = [theme for theme, score in scores.items() if score >= CONFIDENT_SCORE]
+    confident.sort(key=lambda theme: (-scores[theme], first_seen[theme]))
+    return confident[:limit]
@@ -0,0 +1,147 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, date
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.exc import IntegrityError
+
+import singleflight
+import utils
+from crud import get_reading_by_date, save_reading
+from db import AsyncSessionLocal
+
+PREFETCH_DAYS = int(os.getenv("PREFETCH_DAYS", "7"))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+PREFETCH_INTERVAL_HOURS = int(os.getenv("PREFETCH_INTERVAL_HOURS", "6"))
+LLM_STEP_TIMEOUT = float(os.getenv("LLM_STEP_TIMEOUT", "120"))
+BIBLE_PREFETCH_SEGMENTS = int(os.getenv("BIBLE_PREFETCH_SEGMENTS", "8"))
+CACHE_GRACE = 60 * 60 * 48
+
+LITURGICAL_TZ = ZoneInfo("Pacific/Kiritimati")
+
+# Reading title (as used in the "{date}:{title}" cache keys) -> MassReading column.
+READINGS = [
+    ("First Reading", "first"),
+    ("Second Reading", "second"),
+    ("Responsorial Psalm", "psalm"),
+    ("Gospel Reading", "gospel"),
+]
+
+MASS_FIELDS = ["date", "saint", "season", "season_week", "year", "first", "gospel", "psalm", "second"]
+
+
+def liturgical_today() -> date:
+    return datetime.now(LITURGICAL_TZ).date()
+
+
+def cache_expire(day: date, today: date) -> int:
+    # Keep content alive until its day is over, plus the usual 48h grace.
+    return max((day - today).days, 0) * 60 * 60 * 24 + CACHE_GRACE
+
+
+async def load_mass_data(day: date) -> dict:
+    """
+    Return the stored readings for a day, fetching and saving them first if missing.
+    """
+    day_str = day.strftime("%Y-%m-%d")
+    async with AsyncSessionLocal() as session:
+        existing = await get_reading_by_date(day_str, session)
+        if existing:
+            return {field: getattr(existing, field) for field in MASS_FIELDS}
+        data = await utils.fetch_mass_data(day)
+        try:
+            await save_reading(session, data)
+        except IntegrityError:
+            # Another worker saved the same day first.
+            await session.rollback()
+        return data
+
+
+async def bible_segments() -> list:
+    """
+    The most requested Bible study segments, or one default segment per avatar before any traffic.
+    """
+    try:
+        segments = await utils.top_segments(BIBLE_PREFETCH_SEGMENTS)
+    except Exception as e:
+        print(f"Failed to load top Bible study segments: {e}")
+        segments = []
+    return segments or [(avatar["name"], "Growing", "general") for avatar in utils.avatarOption]
+
+
+async def ensure_day(day: date, today: date = None, segments: list = None):
+    """
+    Materialize everything the endpoints read for a day: the mass_readings row, mass:{date},
+    {date}:{title} for each reading, saint:{date}:{avatar} for every avatar and the Bible study
+    for each reading in the top profile segments. Only missing pieces are generated.
+    """
+    today = today or liturgical_today()
+    if segments is None:
+        segments = await bible_segments()
+    day_str = day.strftime("%Y-%m-%d")
+    expire = cache_expire(day, today)
+    data = await load_mass_data(day)
+    key = f"mass:{day_str}"
+    if await utils.get_cache(key) is None:
+        await utils.set_cache(key, data, expire=expire)
+
+    steps = [
+        (f"{day_str}:{title}", lambda ref=data[field], title=title: utils.generate_reading_data(title, ref))
+        for title, field in READINGS
+        if data[field]
+    ]
+    if data["saint"]:
+        steps += [
+            (
+                utils.saint_cache_key(day_str, avatar["name"]),
+                lambda avatar=avatar["name"]: utils.generate_saint_data(data["saint"], avatar),
+            )
+            for avatar in utils.avatarOption
+        ]
+    steps += [
+        (
+            utils.bible_study_cache_key(day_str, title, segment),
+            lambda ref=data[field], segment=segment: utils.generate_bible_study(ref, segment),
+        )
+        for title, field in READINGS
+        if data[field]
+        for segment in segments
+    ]
+    # Each artifact is cached as soon as it is ready, so a failure only loses that artifact.
+    results = await asyncio.gather(
+        *(
+            utils.with_retries(
+                key, singleflight.get_or_generate, key, produce, expire, timeout=LLM_STEP_TIMEOUT
+            )
+            for key, produce in steps
+        ),
+        return_exceptions=True,
+    )
+    for (key, _), result in zip(steps, results):
+        if isinstance(result, Exception):
+            print(f"Failed to generate {key}: {result}")
+
+
+async def fetch_daily_data():
+    await ensure_day(liturgical_today())
+
+
+async def prefetch_horizon(days: int = None):
+    """
+    Fill any gaps for today and the next `days - 1` days. Safe to run repeatedly.
+    """
+    days = days or PREFETCH_DAYS
+    today = liturgical_today()
+    print(f"Prefetching {days} days of content from {today}")
+    semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+    segments = await bible_segments()
+
+    async def run(day):
+        async with semaphore:
+            await ensure_day(day, today, segments)
+
+    horizon = [today + timedelta(days=offset) for offset in range(days)]
+    results = await asyncio.gather(*(run(day) for day in horizon), return_exceptions=True)
+    for day, result in zip(horizon, results):
+        if isinstance(result, Exception):
+            print(f"Prefetch failed for {day}: {result}")
@@ -1,17 +1,27 @@
 from fastapi import APIRouter, Depends, BackgroundTasks, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
 from uuid import uuid4
-from datetime import datetime, timedelta
+from datetime import datetime
 from firebase_admin import auth as firebase_auth
 from pydantic import BaseModel
 from db import get_db
 import models, schemas, utils
 import json
-from utils import client
+import asyncio
+import llm
+import singleflight
+import prompts
+import context
+import timing
+import deletion
+from unit_of_work import UnitOfWork
 from uuid import UUID
+import crud
 from crud import get_reading_by_date, save_reading
 import html
+import base64
+from typing import Optional
 
 router = APIRouter(prefix="/api")
 
@@ -102,42 +112,124 @@ def get_user_id(data: TokenRequest):
     return data.uid  # replace with real user id
 
 
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+class SSEResponse(StreamingResponse):
+    """
+    An event stream that runs cleanup() once the response is over, however it ended. A
+    client that disconnects before the stream is first read never starts the generator,
+    so its own finally block can't be relied on for that.
+    """
+
+    def __init__(self, content, cleanup):
+        super().__init__(content, media_type="text/event-stream", headers=SSE_HEADERS)
+        self.cleanup = cleanup
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                # Closes the upstream completion too if the client left mid-stream.
+                await self.body_iterator.aclose()
+            finally:
+                await self.cleanup()
+
+
+def discard_task(task: asyncio.Task):
+    # Cancel it if it's still running, or mark its result (or exception) as retrieved.
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def split_stream(chunks, marker: str = None):
+    """
+    Re-yield streamed text as ("token", text) until the marker is seen, then as ("tail", text).
+    Text that could be the start of the marker is held back until it can be decided.
+    """
+    buffer = ""
+    in_tail = False
+    try:
+        async for chunk in chunks:
+            if in_tail:
+                yield "tail", chunk
+                continue
+            buffer += chunk
+            if marker:
+                index = buffer.find(marker)
+                if index != -1:
+                    if buffer[:index]:
+                        yield "token", buffer[:index]
+                    in_tail = True
+                    if buffer[index + len(marker):]:
+                        yield "tail", buffer[index + len(marker):]
+                    buffer = ""
+                    continue
+                safe = len(buffer) - len(marker) + 1
+            else:
+                safe = len(buffer)
+            if safe > 0:
+                yield "token", buffer[:safe]
+                buffer = buffer[safe:]
+        if buffer:
+            yield "token", buffer
+    finally:
+        # Close the upstream completion promptly if the consumer stops early.
+        await chunks.aclose()
+
+
+def add_message(
+    uow: UnitOfWork, chat_session_id: UUID, sender: str, encrypted: str, message_id: UUID = None
+) -> UUID:
+    message_id = message_id or uuid4()
+    uow.insert(
+        models.Message,
+        id=message_id,
+        chat_session_id=chat_session_id,
+        sender=sender,
+        text=encrypted,
+        # Part of the primary key, so it is fixed here to keep write-behind replays idempotent.
+        timestamp=datetime.now(),
+    )
+    return message_id
+
+
 @router.get("/chat/session/{session_id}")
 async def get_session(
     session_id: str, uid: str = Query(...), db: AsyncSession = Depends(get_db)
 ):
     # Find session owned by user
-    q = await db.execute(
-        models.ChatSession.__table__.select()
-        .where(models.ChatSession.id == session_id)
-        .where(models.ChatSession.user_id == uid)
-    )
+    q = await db.execute(crud.owned_session(session_id, uid))
     s = q.fetchone()
     if not s:
         raise HTTPException(status_code=404, detail="Session not found")
 
     # Fetch messages ordered by timestamp
-    m = await db.execute(
-        models.Message.__table__.select()
-        .where(models.Message.chat_session_id == session_id)
-        .order_by(models.Message.timestamp)
-        .limit(3)
-    )
+    m = await db.execute(crud.first_messages(session_id, s.created_at))
+    rows = m.fetchall()
+    texts = await utils.decrypt_messages([(row.id, row.text) for row in rows])
     messages = [
         {
             "id": row.id,
             "sender": row.sender,
-            "text": utils.decrypt_text(row.text),
+            "text": text,
             "timestamp": row.timestamp.isoformat(),
         }
-        for row in m.fetchall()
+        for row, text in zip(rows, texts)
     ]
 
     return {
         "id": s.id,
         "created_at": s.created_at.isoformat(),
         "topic": s.topic,
-        "summary": s.summary,
+        "summary": context.read_summary(s.summary),
         "messages": messages,
     }
 
@@ -154,440 +246,228 @@ async def create_session(data: SessionRequest, db: AsyncSession = Depends(get_db
     return {"id": session.id, "created_at": session.created_at}
 
 
+def encode_session_cursor(created_at: datetime, session_id) -> str:
+    raw = f"{created_at.isoformat()}|{session_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_session_cursor(cursor: str):
+    try:
+        created_at, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(session_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/chat/sessions")
 async def list_sessions(
-    uid: str = Query(...), limit: int = 3, db: AsyncSession = Depends(get_db)
+    uid: str = Query(...),
+    limit: int = Query(3, ge=1, le=50),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
 ):
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    q = await db.execute(
-        models.ChatSession.__table__.select()
-        .where(models.ChatSession.user_id == uid)
-        .where(models.ChatSession.created_at > thirty_days_ago)
-        .where(models.ChatSession.topic == "chat")
-        .order_by(models.ChatSession.created_at.desc())
-        
+    page = crud.recent_chat_page(
+        uid, limit, decode_session_cursor(cursor) if cursor else None
     )
-    sessions = []
-    for s in q.fetchall():
-        m = await db.execute(
-            models.Message.__table__.select()
-            .where(models.Message.chat_session_id == s.id)
-            .order_by(models.Message.timestamp)
-        )
-        
-        messages = [
-            {
+    q = await db.execute(crud.with_messages(page))
+    rows = q.fetchall()
+    texts = await utils.decrypt_messages([(row.message_id, row.text) for row in rows])
+    sessions = {}
+    for row, text in zip(rows, texts):
+        s = sessions.get(row.id)
+        if s is None:
+            s = sessions[row.id] = {
                 "id": row.id,
+                "created_at": row.created_at,
+                "topic": row.topic,
+                "summary": context.read_summary(row.summary),
+                "messages": [],
+            }
+        s["messages"].append(
+            {
+                "id": row.message_id,
                 "sender": row.sender,
-                "text": utils.decrypt_text(row.text),
+                "text": text,
                 "timestamp": row.timestamp.isoformat(),
             }
-            for row in m.fetchall()
-        ]
-        if messages:
-            sessions.append(
-                {
-                    "id": s.id,
-                    "created_at": s.created_at.isoformat(),
-                    "topic": s.topic,
-                    "summary": s.summary,
-                    "messages": messages,
-                }
-            )
-    return {"sessions": sessions}
+        )
+    sessions = list(sessions.values())
+    next_cursor = None
+    if len(sessions) > limit:
+        sessions = sessions[:limit]
+        next_cursor = encode_session_cursor(sessions[-1]["created_at"], sessions[-1]["id"])
+    for s in sessions:
+        s["created_at"] = s["created_at"].isoformat()
+    return {"sessions": sessions, "next_cursor": next_cursor}
 
 
-@router.post("/prayer/message")
-async def send_intention(
-    payload: schemas.NewMessageIn, db: AsyncSession = Depends(get_db)
-):
-    encrypted = utils.encrypt_text(payload.text)
-    user_msg = models.Message(
-        id=uuid4(),
-        chat_session_id=payload.chat_session_id,
-        sender=payload.sender,
-        text=encrypted,
-    )
-    db.add(user_msg)
-    await db.commit()
+async def prepare_prayer_turn(payload: schemas.NewMessageIn, db: AsyncSession):
+    """
+    Stage the user message and build the prayer messages. Returns (messages, uow).
+    """
+    uow = UnitOfWork()
+    add_message(uow, payload.chat_session_id, payload.sender, utils.encrypt_text(payload.text))
     user_profile = payload.profile
-    final_themes = await utils.analyze_and_store_themes(payload.user_id, payload.text, db)
+    try:
+        extracted = await utils.extract_themes(payload.text)
+        async with timing.span("db"):
+            final_themes = await utils.store_themes(payload.user_id, extracted, db, uow)
+            # End the read transaction so no connection is held during the model call.
+            await db.commit()
+    except BaseException:
+        await uow.save_staged()
+        raise
     Pastoral_theme = f"User has been exploring themes like: {', '.join(final_themes)}." if final_themes else ""
     current_year = datetime.now().year
     age = current_year - int(user_profile.age_range)
-    prompt = f"""
-        You are a Catholic spiritual companion helping users articulate intercessory prayers inside the Prayer Tab of a spiritual app.  
-        The user has selected the spiritual avatar: {user_profile.avatar}.  
-        The user's profile: age={age}, life_stage={user_profile.life_stage}, spiritual_goals={", ".join(user_profile.spiritual_goals)}, spiritual_maturity={user_profile.spiritual_maturity}.  
-        The pastoral theme/intention type is: {Pastoral_theme}.
-
-        **Purpose and Role**  
-        - You do not pray yourself, do not intercede, bless, or act as the speaker.  
-        - Provide reverent, emotionally grounded words that the user can pray themselves, deeply personal, humble, and faithful to Catholic teaching, Scripture, and the Catechism.  
-        - Avoid citing paragraph numbers.
-
-        ---
-
-        ### **Avatar Voice and Tone (apply throughout acknowledgment, consolation, and prayer):**
-        Reflect the selected avatar’s tone naturally. Avoid caricature or exaggeration.
-        - **Pio**: Modeled after St. Padre Pio. Compassionate, slightly poetic, focused on repentance, the Cross, and surrender to God’s will.
-        - **Therese**: Modeled after St. Thérèse of Lisieux. Gentle, childlike, simple faith; focuses on love, humility, and small offerings.
-        - **Kim**: Youthful, vibrant, passionate, hopeful, grounded in community and daily life; uses patron saints naturally.
-        - **Dan**: Calm, practical, fatherly; emphasizes family, daily provision, grounded trust in God.
-
-        Use the avatar voice consistently in all sections.
-
-        ---
-
-        ### **Intention Reference Guide (use based on {Pastoral_theme}):**
-        For the intention type "{Pastoral_theme}", apply all:
-        - **Surrender Phrase (per avatar):**
-        - Pio: “I surrender to Your holy will.”
-        - Therese: “I trust in Your holy will.”
-        - Kim: “I surrender to Your awesome plan.”
-        - Dan: “I’m in Your hands, Lord.”
-        - **Suggested Catholic practice** (naturally mention in consolation):  
-        - For Anxiety: Surrender in Adoration or before the Crucifix
-        - Sin/Guilt: Confession; fasting; Psalm 51
-        - Family Issues: Pray the Family Rosary
-        - Health/Illness: Offer suffering with Christ; Anointing of the Sick
-        - Work/Financial: Offer daily work in prayer; trust in providence
-        - Guidance: Lectio Divina; Holy Spirit prayer
-        - Grief/Loss: Pray for the dead; remember eternal life
-        - Thanksgiving: Journal a thanksgiving prayer; offer a joyful psalm
-        - Hopeless Cases: Pray a novena; entrust to divine mercy
-        - **Patron Saint** (for Kim & Dan only):
-        - Anxiety: none specified
-        - Sin/Guilt: St. Augustine
-        - Family Issues: St. Joseph
-        - Work/Financial: St. Joseph
-        - Guidance: St. Thomas Aquinas
-        - Grief/Loss: St. Monica
-        - Hopeless Cases: St. Jude
-
-        ---
-
-        ### **Doctrinal & language rules:**
-        - Never casual, slang, overly poetic, or preachy.
-        - Avoid flowery metaphors and sermon tones.
-        - Never imply the AI is praying: avoid phrases like “I lift this soul,” “Please grant them…,” “Guide their heart,” “Let us pray,” or “I’m praying with you.”
-        - Use only phrases the user can say directly to God: “I bring this to You, Lord,” “Help me trust Your plan,” etc.
-        - If the prayer subject’s gender is known, use gender-specific pronouns. Otherwise, use “they/their.”
-        - Use user profile (age, life stage, spiritual goals, spiritual maturity) only to subtly shape tone and focus—never mention them explicitly.
-
-        ---
-
-        ### **Response Format (must follow exactly):**
-
-        **Unlabelled Acknowledgment (1–2 lines)**  
-        - Warm, reverent reflection of user’s intention in the avatar’s voice.  
-        - Do not label or echo user’s words directly.
-
-        **Consolation + Catholic Practice (1–2 lines)**  
-        - Offer pastoral encouragement.
-        - Naturally mention the suggested Catholic practice from the Intention Guide for {Pastoral_theme}.
-
-        **Prayer Section:**  
-        - Title: simple, reverent, in bold font only (e.g., **Prayer for a sick friend**).  
-        - If unclear, use fallback: **Prayer**.
-        - Single blank line.
-        - "In the Name of the Father, and of the Son, and of the Holy Spirit."
-        - Single blank line.
-        - Prayer body in plain text (not bold), split into 3 paragraphs separated by single blank lines:
-        • Paragraph 1 – Praise and Glory to God:
-            - Address God reverently.
-            - Name one divine attribute (e.g., mercy, peace).
-            - Naturally embed one line of Scripture (paraphrased) within a sentence.
-        • Paragraph 2 – The Ask (user’s intention):
-            - 6–8 reverent, emotionally honest sentences.
-            - Always as if user is speaking directly to God.
-        • Paragraph 3 – Surrender:
-            - 2–3 sentences of trust and surrender to God’s Holy Will.
-            - For Pio & Therese: include Marian intercession (e.g., “Mary, Mother of Sorrows…”).
-            - For Kim & Dan: include patron saint for {Pastoral_theme}.
-            - End with avatar-specific surrender phrase for {Pastoral_theme}.
-        - Single blank line.
-        - "Amen"
-
-        **Only the prayer title is bold.** Never bold the prayer text body.
-
-        ---
-
-        ### **Error handling:**
-        If user submits unrelated or unclear input:
-        - First time: “This space is here to help you pray. Would you like to share something or someone to lift up to God?”
-        - If confusion continues: “If you’re not sure how to begin, just let me know what’s on your heart—any burden, sorrow, or joy you’d like to pray about.”
-        Never teach theology, answer questions, or chat casually. Redirect non-prayer content to the Spiritual Guidance Tab.
-
-        ---
-
-        Strictly follow all instructions. Generate only the final text in the exact format.
-        """
-
-    # prompt = f"""
-    # You are a Catholic spiritual companion in the Prayer Tab of a spiritual app.
-
-    # Purpose:
-    # - Help users articulate intercessory prayers in the voice of their selected avatar.
-    # - Maintain a loving, gentle, pastoral voice fully faithful to Catholic doctrine, Scripture, and the Catechism.
-    # - Never use collective language (“we,” “let us pray,” etc) or imply you are praying, blessing, or participating.
-    # - You are not human; do not use human-like phrases like “I’ll pray for you.”
-
-    # ### Detecting intention type & dynamic personalization
-    # Read the user's prayer intention text carefully. Match it to one of these intention types and apply the exact rules below.
-
-    # **Intention Reference Guide:**
-
-    # | Intention Type   | Surrender Phrase (per avatar)                                                                 | Suggested Practice                                        | Patron Saint (Kim/Dan only) |
-    # |------------------|-----------------------------------------------------------------------------------------------|-----------------------------------------------------------|----------------------------|
-    # | Anxiety          | Pio: “I surrender to Your holy will.”<br>Therese: “I trust in Your holy will.”<br>Kim: “I surrender to Your awesome plan.”<br>Dan: “I’m in Your hands, Lord.” | Surrender in Adoration or before the Crucifix             | —                          |
-    # | Sin/Guilt        | Surrender to God’s mercy                                                                      | Confession; fasting; Psalm 51                             | St. Augustine              |
-    # | Family Issues    | Surrender to God’s plan                                                                       | Pray the Family Rosary                                    | St. Joseph                 |
-    # | Health/Illness   | Surrender to God’s care                                                                       | Offer suffering with Christ; Anointing of the Sick        | —                          |
-    # | Work/Financial   | Surrender to God’s will                                                                       | Offer daily work in prayer; trust in providence           | St. Joseph                 |
-    # | Guidance         | Surrender to God’s guidance                                                                   | Lectio Divina; Holy Spirit prayer                          | St. Thomas Aquinas         |
-    # | Grief/Loss      | Surrender to God’s love                                                                       | Pray for the dead; remember eternal life                   | St. Monica                 |
-    # | Thanksgiving     | Surrender in gratitude                                                                        | Journal a thanksgiving prayer; offer a joyful psalm       | —                          |
-    # | Hopeless Cases   | Surrender to God’s hope                                                                       | Pray a novena; entrust to divine mercy                     | St. Jude                   |
-
-    # Instructions:
-    # - Detect which intention type best matches user's text.
-    # - Use:
-    # - The surrender phrase (specific to avatar, if defined; otherwise, general one).
-    # - The suggested Catholic practice.
-    # - Patron saint if avatar is Kim or Dan and there is one; otherwise, skip.
-    # - For Pio and Therese, always mention Mary (Mother of Sorrows or loving Mother) in the prayer.
-
-    # ### Tone & Content
-    # - Use avatar's tone:
-    # - Pio: compassionate, direct, poetic, focused on suffering, surrender, and the Cross.
-    # - Therese: gentle, childlike, humble, friendship with Jesus, Mary as loving Mother.
-    # - Kim: energetic, faith-filled, hopeful, community language.
-    # - Dan: practical, fatherly, wise, God as provider.
-    # - Consider user’s age, gender, life stage, but never mention them directly.
-
-    # ### Response flow:
-    # When user's intention is clear:
-    # 1. Begin with an unlabelled acknowledgment paragraph in avatar’s tone.
-    # 2. Follow with brief consolation & suggest the Catholic practice (from the table above).
-    # 3. Then:
-    # - Heading on new line: Prayer (not bolded). Add single blank line before & after.
-    # - Prayer text must be in **bold font styling** (use **text** or <b>text</b>).
-    # - Structure:
-    # a) Praise and Glory to God: reverently address God, praise divine attribute, weave in Gospel or Psalm naturally.
-    # b) The Ask: present user's specific intention in 4–6 heartfelt, faith-filled sentences.
-    # c) Surrender: 2–3 sentences expressing trust; include Mary (for Pio/Therese) or patron saint (for Kim/Dan) as per table.
-    # - End with the surrender phrase from the table.
-
-    # When user's input is unclear or unrelated (e.g., “hi,” “how are you”):
-    # - Gently redirect: “This space is here to help you pray. Would you like to share something or someone to lift up to God?”
-    # - If unclear input continues: “If you’re not sure how to begin, just let me know what’s on your heart — any burden, sorrow, or joy you’d like to pray about.”
-    # - Never answer casual chat, questions, or teaching; redirect those to Spiritual Guidance tab.
-
-    # **Always produce a single coherent message**:
-    # - acknowledgment paragraph
-    # - consolation + Catholic practice paragraph
-    # - heading 'Prayer'
-    # - bolded prayer with 3 sections
-
-    # User's selected avatar: {user_profile.avatar}
-    # User's prayer intention: {payload.text}
-
-    # Follow these rules strictly to dynamically personalize the prayer response.
-    # """
-    
-    ai_response = await utils.call_llm(prompt)
-    print("prayer response===>", ai_response)
-    ai_msg = models.Message(
-        id=uuid4(),
-        chat_session_id=payload.chat_session_id,
-        sender="ai",
-        text=utils.encrypt_text(ai_response),
+    messages = prompts.messages(
+        "prayer",
+        utils.normalize_avatar(user_profile.avatar),
+        age=age,
+        life_stage=user_profile.life_stage,
+        spiritual_goals=", ".join(user_profile.spiritual_goals),
+        spiritual_maturity=user_profile.spiritual_maturity,
+        themes=Pastoral_theme,
+        text=payload.text,
     )
-    db.add(ai_msg)
-    await db.commit()
+    return messages, uow
+
+
+@router.post("/prayer/message")
+async def send_intention(
+    payload: schemas.NewMessageIn, db: AsyncSession = Depends(get_db)
+):
+    messages, uow = await prepare_prayer_turn(payload, db)
+    try:
+        async with timing.span("completion"):
+            ai_response = await utils.call_llm(messages)
+        ai_msg_id = add_message(
+            uow, payload.chat_session_id, "ai", utils.encrypt_text(ai_response)
+        )
+        async with timing.span("persist"):
+            await uow.persist(db)
+    finally:
+        # Keeps the user's message if the completion failed; a no-op once persisted.
+        await uow.save_staged()
 
     return {
-        "id": str(ai_msg.id),
+        "id": str(ai_msg_id),
         "sender": "ai",
         "text": ai_response,
         "timestamp": datetime.now().isoformat(),
     }
 
 
+@router.post("/prayer/message/stream")
+async def send_intention_stream(
+    payload: schemas.NewMessageIn, db: AsyncSession = Depends(get_db)
+):
+    messages, uow = await prepare_prayer_turn(payload, db)
+    ai_msg_id = uuid4()
+
+    async def event_stream():
+        ai_response = ""
+        try:
+            async for kind, chunk in split_stream(
+                llm.stream_chat(messages, model="gpt-4o")
+            ):
+                ai_response += chunk
+                yield sse_event("token", {"text": chunk})
+            ai_response = ai_response.strip()
+            add_message(uow, payload.chat_session_id, "ai", utils.encrypt_text(ai_response), ai_msg_id)
+            # The request session is closed once streaming starts, so this uses a fresh one.
+            await uow.persist()
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        yield sse_event(
+            "done",
+            {
+                "id": str(ai_msg_id),
+                "sender": "ai",
+                "text": ai_response,
+                "timestamp": datetime.now().isoformat(),
+            },
+        )
+
+    # Keeps the user's message if the stream failed or the client left; a no-op once persisted.
+    return SSEResponse(event_stream(), uow.save_staged)
+
+
 @router.post("/bible/saint")
 async def generate_saint_reading(
     request: SaintRequest, db: AsyncSession = Depends(get_db)
 ):
-    encrypted = utils.encrypt_text(request.text)
-    user_msg = models.Message(
-        id=uuid4(),
-        chat_session_id=request.chat_session_id,
-        sender=request.sender,
-        text=encrypted,
-    )
-    db.add(user_msg)
-    await db.commit()
-    key = f"saint:{request.date_str}"
-    cached = await utils.get_cache(key)
+    uow = UnitOfWork()
+    add_message(uow, request.chat_session_id, request.sender, utils.encrypt_text(request.text))
+    key = utils.saint_cache_key(request.date_str, request.avatar_name)
     try:
-        if cached:
-
-            ai_msg = models.Message(
-                id=uuid4(),
-                chat_session_id=request.chat_session_id,
-                sender="ai",
-                text=utils.encrypt_text(cached),
-            )
-            db.add(ai_msg)
-            await db.commit()
-            return {
-                "id": str(ai_msg.id),
-                "sender": "ai",
-                "text": cached,
-                "timestamp": datetime.now().isoformat(),
-            }
-        else:
-            prompt = f"""
-            You are a Catholic spiritual companion inside a mobile app. The app provides users with daily educational reflections about a saint.
-            When given a saint's name and an avatar name (Pio, Therese, Kim, or Dan), generate a brief, structured response about the saint in the voice of the avatar.
-
-            Use a reverent, educational, and pastoral tone. Do not include personal intentions or casual/slang language.
-            Do not impersonate the saint or avatar. Ensure all facts are historically accurate and consistent with Catholic tradition.
-
-            Format:
-            1. Start with the saint's name in **bold**.
-            2. A 2-sentence overview of who the saint is and why they're significant. Do not include in **bold**.
-            3. 3 sentences about their time period, origin, and historical context.  Do not include in **bold**.
-            4. 3–4 sentences about their key works, teachings, and notable quotes. Do not include in **bold**.
-            5. A 3–4 sentence prayer of intercession in **bold**. For Pio and Therese, reference Mary. For Kim and Dan, include patronage or a relevant saint. End with: “Saint [Name], pray for us. Amen.” in **bold**
-
-            Saint: {request.saint_name}
-            Avatar: Pio
-            """
-            response = client.chat.completions.create(
-                model="gpt-4-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a faithful Catholic scripture companion.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.7,
-                max_tokens=600,
-            )
-
-            reading_output = response.choices[0].message.content
-            ai_msg = models.Message(
-                id=uuid4(),
-                chat_session_id=request.chat_session_id,
-                sender="ai",
-                text=utils.encrypt_text(reading_output),
-            )
-            db.add(ai_msg)
-            await db.commit()
-            await utils.set_cache(key, reading_output)
-            return {
-                "id": str(ai_msg.id),
-                "sender": "ai",
-                "text": reading_output,
-                "timestamp": datetime.now().isoformat(),
-            }
+        # Prefetched for every avatar, so this is normally a cache hit.
+        async def generate():
+            return await utils.generate_saint_data(request.saint_name, request.avatar_name)
+
+        async with timing.span("generate"):
+            reading_output = await singleflight.get_or_generate(key, generate)
+        ai_msg_id = add_message(
+            uow, request.chat_session_id, "ai", utils.encrypt_text(reading_output)
+        )
+        async with timing.span("persist"):
+            await uow.persist(db)
+        return {
+            "id": str(ai_msg_id),
+            "sender": "ai",
+            "text": reading_output,
+            "timestamp": datetime.now().isoformat(),
+        }
 
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to generate saint reading: {str(e)}"
         )
+    finally:
+        # Keeps the user's message if generation failed; a no-op once persisted.
+        await uow.save_staged()
 
 
 @router.post("/bible/scripture")
 async def generate_scripture_reading_api(
     request: ScriptureRequest, db: AsyncSession = Depends(get_db)
 ):
-    encrypted = utils.encrypt_text(request.text)
-    user_msg = models.Message(
-        id=uuid4(),
-        chat_session_id=request.chat_session_id,
-        sender=request.sender,
-        text=encrypted,
-    )
-    db.add(user_msg)
-    await db.commit()
+    uow = UnitOfWork()
+    add_message(uow, request.chat_session_id, request.sender, utils.encrypt_text(request.text))
     key = f"{request.date}:{request.reading_title}"
-    cached = await utils.get_cache(key)
     try:
-        if cached:
-            print(f"Returning cached reading for {key} =======>", cached)
-            ai_msg = models.Message(
-                id=uuid4(),
-                chat_session_id=request.chat_session_id,
-                sender="ai",
-                text=utils.encrypt_text(cached),
-            )
-            db.add(ai_msg)
-            await db.commit()
-            return {
-                "id": str(ai_msg.id),
-                "sender": "ai",
-                "text": cached,
-                "timestamp": datetime.now().isoformat(),
-            }
-        else:
-            prompt = f"""
-            You are a Catholic spiritual companion inside the Bible Study Tab of a Catholic app.
-            Your task is to produce a Scripture reading output that follows these requirements:
-
-            - Use the ESV Catholic Edition (preferred). If unavailable, use NABRE or RSV‑CE.
-            - Maintain a reverent, faithful-to-doctrine tone, without additional commentary.
-            - Format the output exactly as:
-            1. Reading title in ALL CAPS (e.g., “FIRST READING” or “GOSPEL”) — use: {request.reading_title}.
-            2. Scripture reference — use: {request.scripture_reference}.
-            3. A one-sentence overview briefly summarizing what the passage contains.
-            4. The full text of the passage, formatted so that:
-                - Each verse starts with Verse number in parentheses and verse text.
-                - Verse number and Verse text itself must be involved together in ** **.  e.g.**(verse number) verse text**.
-            - Do NOT include commentary, footnotes, headings, or cross-references.
-            - Keep formatting faithful to the translation’s style.
-
-            Now, produce only the Scripture reading output in this format using these inputs:
-            - reading_title: "{request.reading_title}"
-            - scripture_reference: "{request.scripture_reference}"
-            """
-            response = client.chat.completions.create(
+        async def generate():
+            return await llm.chat(
+                prompts.messages(
+                    "reading_verses",
+                    reading_title=request.reading_title,
+                    scripture_reference=request.scripture_reference,
+                ),
                 model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a faithful Catholic scripture companion.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
                 temperature=0.5,
             )
 
-            reading_output = response.choices[0].message.content
-
-            ai_msg = models.Message(
-                id=uuid4(),
-                chat_session_id=request.chat_session_id,
-                sender="ai",
-                text=utils.encrypt_text(reading_output),
-            )
-            db.add(ai_msg)
-            await db.commit()
-            await utils.set_cache(key, reading_output)
-            return {
-                "id": str(ai_msg.id),
-                "sender": "ai",
-                "text": reading_output,
-                "timestamp": datetime.now().isoformat(),
-            }
+        async with timing.span("generate"):
+            reading_output = await singleflight.get_or_generate(key, generate)
+        ai_msg_id = add_message(
+            uow, request.chat_session_id, "ai", utils.encrypt_text(reading_output)
+        )
+        async with timing.span("persist"):
+            await uow.persist(db)
+        return {
+            "id": str(ai_msg_id),
+            "sender": "ai",
+            "text": reading_output,
+            "timestamp": datetime.now().isoformat(),
+        }
 
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to generate reading: {str(e)}"
         )
+    finally:
+        await uow.save_staged()
 
 
 @router.get("/mass-readings", response_model=MassReadingResponse)
@@ -596,10 +476,10 @@ async def get_mass_readings(
     db: AsyncSession = Depends(get_db),
 ):
     # today = datetime.now().strftime("%Y-%m-%d")
-    print("Fetching Mass readings for date:=======>", date_str)
     key = f"mass:{date_str}"
     try:
-        cached = await utils.get_cache(key)
+        async with timing.span("cache"):
+            cached = await utils.get_cache(key)
         if cached:
             date = cached.get("date", date_str)
             saint = cached.get("saint", "")
@@ -612,7 +492,6 @@ async def get_mass_readings(
                 "second": clean_reading_text(cached.get("second", "")),
                 "gospel": clean_reading_text(cached.get("gospel", "")),
             }
-            print(f"Returning cached acted Mass readings for {date} =======>")
             return MassReadingResponse(
                 date=date,
                 saint=saint,
@@ -624,11 +503,11 @@ async def get_mass_readings(
 
         else:
             
-            readings = await get_reading_by_date(date_str, db)
+            async with timing.span("db"):
+                readings = await get_reading_by_date(date_str, db)
             # if readings is None:
             #     await utils.fetch_daily_data(db)
             # readings = await get_reading_by_date(date_str, db)
-            print("readings===>", date_str, readings)
             date = readings.date if readings else date_str
             saint = readings.saint if readings else ""
             season = readings.season if readings else ""
@@ -651,7 +530,8 @@ async def get_mass_readings(
                 "psalm": readings.psalm,
                 "second": readings.second,
             }
-            await utils.set_cache(key, data)
+            async with timing.span("cache"):
+                await utils.set_cache(key, data)
             return MassReadingResponse(
                 date=date,
                 saint=saint,
@@ -668,569 +548,157 @@ async def get_mass_readings(
 async def study_bible(
     payload: schemas.NewReadingIn, db: AsyncSession = Depends(get_db)
 ):
-    # Save user message
-    key = f"reading:{payload.date}: {payload.reading_title}"
-    encrypted = utils.encrypt_text(payload.text)
-    user_msg = models.Message(
-        id=uuid4(),
-        chat_session_id=payload.chat_session_id,
-        sender=payload.sender,
-        text=encrypted,
-    )
-    db.add(user_msg)
-    await db.commit()
+    # Content is shared per profile segment, not per user.
+    segment = utils.get_profile_segment(payload.profile)
+    key = utils.bible_study_cache_key(payload.date, payload.reading_title, segment)
+    utils.record_segment_hit(segment)
+    uow = UnitOfWork()
+    add_message(uow, payload.chat_session_id, payload.sender, utils.encrypt_text(payload.text))
     try:
-        cached = await utils.get_cache(key)
-        if cached:
-            ai_msg = models.Message(
-                id=uuid4(),
-                chat_session_id=payload.chat_session_id,
-                sender="ai",
-                text=utils.encrypt_text(cached),
-            )
-            db.add(ai_msg)
-            await db.commit()
-            return {
-                "id": str(ai_msg.id),
-                "sender": "ai",
-                "text": cached,
-                "timestamp": datetime.now().isoformat(),
-            }
-        else:
-            user_profile = payload.profile
-            # spiritual_maturity = utils.get_spirituality_stage(
-            #     user_profile.spiritual_maturity
-            # )
-            # spiritual_goals = ", ".join(user_profile.spiritual_goals)
-            age = datetime.now().year - int(user_profile.age_range)
-            # prompt = f"""
-            # You are an AI spiritual guide for a Catholic faith app called RYSEN. The user has selected the “Study Verse” button. Your role is to guide them through a structured Catholic Bible study based on the selected verse.
-
-            # The verse is: **{payload.scripture_reference}**
+        async def generate():
+            return await utils.generate_bible_study(payload.scripture_reference, segment)
 
-            # The user’s profile:
-            # - Age Range: {user_profile.age_range}
-            # - Gender: {user_profile.sex}
-            # - Life Stage: {user_profile.life_stage}
-            # - Spiritual Maturity: {user_profile.spiritual_maturity}
-            # - Spiritual Goals: {spiritual_goals}
-            # - Avatar Voice: {user_profile.avatar}
-
-            # Follow these precise instructions:
-
-            # 1. Begin with the **verse title in bold** (e.g., **Matthew 10:12-15**) on its own line, then leave a blank line.
-
-            # 2. Write 1–2 sentences summarizing what this reading is about (without labeling this section).
-
-            # 3. Provide a 3-part Bible study, formatted for readability and styled with spacing, bold, and italics as appropriate:
-
-            # **Biblical Context** – In 2–3 sentences, describe what is happening just before or around this verse in the Bible. Focus on narrative grounding (not thematic interpretation).
-
-            # **Theological Study** –
-            # - Offer historical context *only if* it significantly clarifies the verse’s meaning.
-            # - Include any relevant cross-references to other Scriptures (e.g., Old Testament connections, Christ’s fulfillment of prophecy).
-            # - any verse or scripture in *semi-bold*
-            # - Add 1–2 sentences from theologians, Saints, or Bible scholars, clearly attributed (e.g., *St. Augustine wrote...*).
-            # - Include insights from the Catechism of the Catholic Church or Church teaching *only if directly relevant*, and do not include paragraph numbers.
-
-            # **Reflection** – Offer a spiritual reflection with practical insights for life and prayer, subtly tailored to the user’s stage and spiritual goals without stating them explicitly. End this section with a short, simple challenge or encouragement for spiritual growth (e.g., “Take five minutes today to...”), ensuring it's practical and compassionate.
-
-            # 4. After one line space, write a short closing prayer of 1–2 sentences. Begin this with “**Pray –**” and write it for the user to say privately. Do not include human-like phrases or imply that the AI is participating in prayer.
-
-            # 5. Use the tone and voice of the user’s avatar:
-            # - **Pio**: Compassionate, direct, reverent, emphasizing mercy, repentance, and the Cross.
-            # - **Therese**: Gentle, simple, childlike, focused on love and small acts of faith.
-            # - **Kim**: Passionate, relatable, energetic, showing how Scripture fits daily life.
-            # - **Dan**: Calm, practical, fatherly, grounding Scripture in everyday duties and faith.
-
-            # Subtly reflect this avatar tone across the entire study without overdoing it.
-
-            # Only include direct Scripture quotes (e.g., “**The Kingdom of Heaven is at hand**”) in **bold text**, and ensure all teaching remains faithful to Catholic doctrine.
-
-            # If the verse is invalid or lacks sufficient material for reflection, return a gentle message suggesting the user choose a different verse, along with a short general prayer asking for wisdom in studying Scripture.
-            # """
-            
-            prompt = f"""
-            You are an AI spiritual guide for a Catholic app called RYSEN. Your task is to create a complete Bible study session when the user selects the "Study Verse" button. The structure and content must follow these rules exactly:
-
-            1. Begin with the Bible verse title in **bold** (e.g., **Matthew 10:12–15**), followed by a one-line break.
-
-            2. Write a 1–2 sentence **overview** introducing the passage’s theme or context, followed by a line break.
-
-            3. Structure the rest in 4 parts, with each section separated by a line break:
-
-            ---
-
-            **Biblical Context** (2–3 sentences)  
-            - Explain the background or situation of the verse in the biblical narrative.  
-            - Ensure clarity for someone with limited theological background.
-
-            ---
-
-            **Theological Study** (8–10 sentences)  
-            - Explain the theological/spiritual meaning.  
-            - Optionally include:
-            - Historical context (briefly, if helpful).  
-            - Cross-referenced Scriptures (quoted and bolded).  
-            - Quotes or insights from saints or Catholic theologians (e.g., Augustine, Aquinas, Pope Benedict XVI).  
-            - Catholic teaching (from the Catechism, quoted directly but without paragraph numbers).
-
-            ---
-
-            **Reflection** (4–6 sentences)  
-            - Offer a spiritually nourishing reflection with practical, encouraging takeaways.  
-            - Subtly tailor this to the user profile below (without directly referencing age, gender, etc.).  
-            - End with one gentle Heart Question (e.g., “Where is God inviting you to trust Him more deeply today?”).  
-            - Optionally suggest one small action (e.g., “Spend five quiet minutes reflecting on God’s mercy.”).
-
-            ---
-
-            **Prayer** (Maximum 3 sentences)  
-            - End with a short prayer the user can say privately.  
-            - Format: Pray – Lord, [short prayer]. Amen.  
-            - Do not imply that you (the assistant) are praying or present.
-
-            ---
-
-            Ensure the tone and phrasing reflect the user's selected **avatar** and **user profile** below. Avoid slang, human-like expressions, or inappropriate warmth.
-
-            ---
-
-            **User Profile**  
-            age: {age}  
-            Sex: {user_profile.sex}  
-            Life Stage: {user_profile.life_stage}  
-            Spiritual Maturity: {user_profile.spiritual_maturity}  
-            Spiritual Goals: {", ".join(user_profile.spiritual_goals)}  
-
-            **Avatar Tone**: {user_profile.avatar}  
-            - Pio: Direct and compassionate, focused on repentance and God's mercy  
-            - Therese: Gentle and affectionate, emphasizing trust and childlike faith  
-            - Kim: Relatable and energetic, connecting Scripture to daily life  
-            - Dan: Calm and practical, linking faith to family and work
-
-            ---
-            must Scripture, with quoted text in **bold** and citation in plain text(e.g., **Come to me, all you who are weary and burdened**, Matthew 11:28)
-            Begin the Bible study now for this verse: **{payload.scripture_reference}**
-            """
-
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": prompt,
-                    },
-                ],
-                temperature=0.6,
-            )
-            ai_response = response.choices[0].message.content
-            ai_msg = models.Message(
-                id=uuid4(),
-                chat_session_id=payload.chat_session_id,
-                sender="ai",
-                text=utils.encrypt_text(ai_response),
-            )
-            db.add(ai_msg)
-            await db.commit()
-            await utils.set_cache(key, ai_response)
-            return {
-                "id": str(ai_msg.id),
-                "sender": "ai",
-                "text": ai_response,
-                "timestamp": datetime.now().isoformat(),
-            }
+        async with timing.span("generate"):
+            ai_response = await singleflight.get_or_generate(key, generate)
+        ai_msg_id = add_message(
+            uow, payload.chat_session_id, "ai", utils.encrypt_text(ai_response)
+        )
+        async with timing.span("persist"):
+            await uow.persist(db)
+        return {
+            "id": str(ai_msg_id),
+            "sender": "ai",
+            "text": ai_response,
+            "timestamp": datetime.now().isoformat(),
+        }
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Deletion failed: {str(e)}")
+    finally:
+        await uow.save_staged()
 
 
-@router.post("/chat/message")
-async def send_message(
-    payload: schemas.NewMessageIn, db: AsyncSession = Depends(get_db)
+def flag_chat_turn(
+    payload: schemas.NewMessageIn, user_msg_id: UUID, encrypted: str, uow: UnitOfWork
 ):
-    # Save user message
-    encrypted = utils.encrypt_text(payload.text)
-    user_msg = models.Message(
+    uow.insert(
+        models.FlaggedResponse,
         id=uuid4(),
-        chat_session_id=payload.chat_session_id,
-        sender=payload.sender,
+        message_id=user_msg_id,
         text=encrypted,
+        user_email=payload.user_email,
+        reviewed=False,
     )
-    db.add(user_msg)
-    await db.commit()
-    user_profile = payload.profile
-    avatar_description = utils.get_avatar_name(user_profile.avatar)
-    spiritual_maturity = user_profile.spiritual_maturity
-    spiritual_goals = ", ".join(user_profile.spiritual_goals)
-
-    m = await db.execute(
-        models.Message.__table__.select()
-        .where(models.Message.chat_session_id == payload.chat_session_id)
-        .where(models.Message.sender == "ai")
-        .order_by(models.Message.timestamp)
-        .limit(1)
-    )
-    last_answers = " ".join([utils.decrypt_text(row.text) for row in m.fetchall()])
-    PASTORAL_KEYWORDS = ["fear", "trust", "forgiveness", "grief", "hope", "suffering", "joy", "love", "mercy", "healing"]
-    is_harmful = await utils.check_openai_moderation(payload.text)
-
-    if is_harmful:
-        db.add(models.FlaggedResponse(
-            id = uuid4(),
-            message_id=user_msg.id,
-            text=encrypted,
-            user_email=payload.user_email
-        ))
-        await db.commit()
-        fallback = "This sounds like a heavy burden. Speaking with a trusted priest or counselor can offer guidance and support. Is there another concern you’d like to explore together?"
-        ai_msg = models.Message(
-        id=uuid4(),
-        chat_session_id=payload.chat_session_id,
-        sender="ai",
-        text= utils.encrypt_text(fallback),
-        )
-        db.add(ai_msg)
-        await db.commit()
+    fallback = "This sounds like a heavy burden. Speaking with a trusted priest or counselor can offer guidance and support. Is there another concern you’d like to explore together?"
+    ai_msg_id = add_message(uow, payload.chat_session_id, "ai", utils.encrypt_text(fallback))
 
-        return {
-            "id": str(ai_msg.id),
-            "sender": "ai",
-            "text": fallback,
-            "timestamp": datetime.now().isoformat(),
-            "follow_ups": [],
-        }
-    final_themes = await utils.analyze_and_store_themes(payload.user_id, payload.text, db)
-    Pastoral_theme = f"{', '.join(final_themes)}." if final_themes else "" 
-    age = datetime.now().year - int(user_profile.age_range)   
-    # prompt = f"""
-    # You are an AI-powered Catholic Spiritual Companion in the "Spiritual Counsel" feature of a spiritual app.
-    # **Your purpose:**  
-    # To offer extended, dialogue-like reflections to help users pray, discern, and draw closer to God through the sacramental life, fully faithful to Catholic doctrine, Scripture, the Catechism of the Catholic Church (CCC), and the writings and lives of the Saints.  
-    # You are NOT a human, priest, or divine authority.
-    # ---
-    # ## Style and Doctrine Guidelines
-    # - Use a warm, encouraging, pastoral tone.
-    # - Explicitly cite Scripture (e.g., Psalm 34:18). Present quoted Scripture in **bold**.
-    # - Reference CCC (without numbers), Saints' writings or lives (e.g., St. Thérèse’s "Story of a Soul"), and occasionally Catholic Church-approved miracles (e.g., Eucharistic miracles of Lanciano or Bolsena, or experiences of stigmata and visions) where relevant.
-    # - Avoid human-like phrases (e.g., “I’ve always loved,” “I’ll pray for you,” “let us pray,” etc.). Instead, use observational language (“Many find peace in…”, “There’s a beauty in…”).
-    # - Do NOT offer forgiveness (e.g., “You are forgiven”). Instead, encourage sacraments (“There’s something so beautiful about Confession…”).
-    # - Suggest traditional Catholic practices when relevant (e.g., Rosary, Divine Mercy Chaplet, Lectio Divina), ensuring they feel varied, contextually appropriate, and adapted to user’s spiritual maturity.
-    # - Gently correct if the user brings up practices contrary to Catholic teaching (e.g., astrology, crystals).
-    # ---
-
-    # ## Personalization & Voice
-    # - Match the avatar’s tone:
-    # * Pio: Compassionate, direct, poetic, emphasizing mercy & the Cross.
-    # * Therese: Gentle, simple, childlike, focused on small acts & trust.
-    # * Kim: Passionate, energetic, connecting faith to daily life, mention community & patron saints.
-    # * Dan: Calm, practical, linking faith to family & daily responsibilities.
-    # - Subtly adapt to user's:
-    # * age range, gender, life stage, spiritual maturity, and spiritual goals.
-    # - NEVER directly mention these profile traits in the text; use them to guide style and focus.
-    # ---
-    # ## Safety & Sensitivity
-    # - For very sensitive topics (e.g., abuse, suicide, abortion): show compassion, suggest connecting with a priest or counselor.
-    # - Never appear to share lived experience or imply prayer as AI.
-    # ---
-
-    # ## Pastoral Memory
-    # - Subtly incorporate up to 3 recent pastoral themes (e.g., fear, trust, forgiveness) to shape scripture/saints choice, **without** explicitly mentioning them.
-
-    # ---
-
-    # ## Clarity
-    # If the user's input is unclear or unrelated, gently prompt them to share what's on their heart.
-    # ---
-
-    #     **User Profile:**
-    #     - Age Range: {user_profile.age_range}
-    #     - Sex: {user_profile.sex}
-    #     - Life Stage: {user_profile.life_stage}
-    #     - Spiritual Maturity: {spiritual_maturity}
-    #     - Spiritual Goals: {spiritual_goals}
-    #     - Avatar: {user_profile.avatar} (see tone guide below)
-
-    #     **User's Question:**  
-    #     {payload.text}
-    #     **Previous Answer:**
-    #     {last_answers}
-    #     **Pastoral theme ** {Pastoral_theme}
-    # ## Response Structure
-    # 1. Begin with a warm acknowledgment of the user's question or situation, reflecting avatar's tone.
-    # 2. If the question is doctrinal, first give a concise Catholic answer grounded in Scripture, CCC, and Saints.
-    # 3. Expand with a pastoral reflection:
-    # * Weave in Scripture **bold**, Saints’ teachings, miracles.
-    # * Offer practical steps (e.g., “Perhaps lighting a candle tonight…”).
-    # *any words from Bible must be in **bold**
-    # 4. End with:
-    # * 1–2 open-ended reflective questions (“What might God be whispering to you here?”).
-    # * 2 short, clickable prompts (max 8 words) as natural follow-ups (e.g., “How to grow in trust?”).
-    # - Avoid repetitive greetings and Gen Z slang.
-    # - Write clearly, with single-line spacing and paragraph breaks for readability.
-    # Begin your spiritually grounded, gentle, and structured response now.
-    #     Your response must be in valid JSON, like this:
-
-    #     '{{
-    #     "answer": "Your full reply to the user here.",
-    #     "follow_ups": ["clickable prompt1", "clickable prompt2"]
-    #     }}'
-
-    #     Respond only with valid raw JSON, without markdown formatting or code blocks.
-    #     Do NOT include ```json or ``` in the output.
-    # """
-    prompt = f"""
-    You are an AI-powered Catholic Spiritual Companion in the Spiritual Counsel section of a spiritual app.
-
-    ### Purpose:
-    - You are an AI-powered Catholic Spiritual Companion for the Spiritual Counsel section of a Catholic faith app, designed to provide warm, conversational, and hopeful guidance as a supportive friend in faith—not a human, priest, therapist, or divine authority. 
-    - Your role is to offer extended, dialogue-like reflections to help users pray, discern, and grow closer to God through the sacramental life, staying fully faithful to Catholic doctrine, Scripture, the Catechism of the Catholic Church (CCC), and the writings and lives of the Saints.
-    - You are aware of the app’s other features: the Daily Readings section (offering daily Mass readings, Bible study, reflection, and Saint of the Day) and the Personal Prayer section (generating prayer words for user intentions, not praying on behalf of users).
-    - You are **not** human, priest, therapist, or divine authority.
-    - Offer extended, dialogue-like reflections to help users pray, discern, and grow closer to God.
-    - Always faithful to Catholic doctrine, Scripture, the Catechism of the Catholic Church (CCC, no chapter refs), writings and lives of the Saints, and approved Church miracles (e.g., Eucharistic miracles like Lanciano).
-
-    ---
-
-    ### **Avatar voice guidance**:
-    The user has selected avatar: **{user_profile.avatar}**.  
-    Use its tone naturally throughout, without exaggeration:
-    - **Pio**: Compassionate, direct, cross-centered, repentance and mercy (e.g., “The Cross is a gift of mercy.”)
-    - **Thérèse**: Gentle, childlike trust and humility (e.g., “Jesus welcomes your heart like a little flower.”)
-    - **Kim**: Cheerful 21-year-old youth leader, passionate, relatable (e.g., “Faith shines even in the daily grind.”)
-    - **Dan**: Mature 40-year-old father, calm, practical, grounded in family and faith (e.g., “God’s provision holds steady through life’s storms.”)
-
-    Avoid slang, overused greetings, repetition, Gen Z words, “mate,” or caricature.  
-    Maintain reverence and humility.
-
-    ---
-
-    ### **Tone & Content**:
-    - Use a warm, caring, encouraging, and pastoral tone to inspire engagement with faith, prayer, and the sacramental life.
-    - Ground all responses in Catholic teaching, explicitly citing.
-      o Scripture, with quoted text in **bold** and citation in plain text(e.g., **Come to me, all you who are weary and burdened**, Matthew 11:28), using standard Catholic translations (e.g., NABRE, RSV-CE).
-      o	CCC, without chapter references.
-      o	Saints’ writings, sayings, or lives (e.g., St. Thérèse’s Story of a Soul, St. Augustine’s Confessions).
-    - Use open-ended, invitational language; never imperatives or commands.
-    - You are **not** human, Never imply lived experience: avoid  e.g. “I’ll pray for you,” “Let us reflect,” “I’ve been there.”
-    - Avoid mystical/prophetic claims like “God is whispering to you.” Do not imply the AI creates spiritual experiences. Speak with reverence, letting the user discover God’s presence.
-    - Always keep the focus on Christ, Scripture, Saints, the Sacraments—not yourself or the app.
-    - Subtly shape reflections based on user profile:
-    age={age}, gender={user_profile.sex}, life_stage={user_profile.life_stage}, spiritual_goals={", ".join(user_profile.spiritual_goals)}, spiritual_maturity={user_profile.spiritual_maturity}
-    Do **not** mention these explicitly—only let them guide tone, complexity, suggestions.
-
-    ---
-
-    ### **All glory to God**:
-    - Lead users to encounter God’s love, not to highlight the app or AI.
-    - Never present AI as guide or transformation source.
-    - Always point to:
-    o  God the Father, who loves them
-    o Jesus Christ, crucified & risen
-    o Holy Spirit, giver of courage & grace
-    o The Church & Sacraments
-    - Use phrases like “The Church teaches…”, “Scripture reminds us…”, “Many have found comfort in…”  
-    - Avoid first-person claims: “I’m here for you,” “I’m guiding you.”
-
-    ---
-
-    ### **Content**:
-    - Quote Scripture: show text in **bold**, citation in plain text (e.g., **Come to me…** Matthew 11:28).
-    - Use standard translations (NABRE, RSV-CE).
-    - Reference CCC & Saints’ writings (no para numbers).
-    - Where meaningful, mention approved miracles.
-    - Vary spiritual suggestions (Confession, Eucharist, Adoration, Rosary, journaling, silence, Lectio Divina, charity).
-    - Redirect non-Catholic practices gently to Catholic spirituality.
-
-    ---
-
-    ### **Doctrinal Questions(e.g., Church teaching, Scripture meaning, apologetics like “Why is there suffering?”):**:
-    o Provide a clear, doctrinally accurate answer using Scripture, CCC, or Saints.
-    o Expand with an extended pastoral reflection to help the user interiorize the truth lovingly.
-    o For sensitive topics (e.g., abortion, gender, IVF, same-sex relationships), remain faithful to Catholic teaching with tenderness and pastoral love.
-    ---
-
-    ### **Personal Questions**:
-    - o	Offer extended, loving reflections filled with Scripture, Saints’ wisdom, and tailored spiritual invitations.
-
-    ---
-
-    ### **AI-Directed or Off-topic**:
-    o Gently redirect with a natural, varied response aligned with the guideline: “This space is here to reflect on your faith journey. What’s on your heart right now?” (e.g., “This is a place to explore your faith. What’s stirring in your soul today?”).
-    o Do not every respond implying that the AI has human or lived experiences.
-
-    ---
-    ### **Greeting, Off-Topic, or Redirected Questions**:
-    o If the user’s input is a general greeting (e.g., “Hi,” “Hey,” “Hello”), an off-topic question unrelated to faith (e.g., “What is Python?”, “Why is the sky blue?”), a date-related question (e.g., “What is today’s Gospel?”, “Who is the Saint of the Day?”), or repeated unclear/gibberish inputs, follow the Error Handling section’s short redirect responses only. Do not initiate doctrinal or pastoral reflections for these cases.
-
-    ###Error Handling – Special Handling for Vague, Off-Topic, or Redirected Input###
-    These responses override the full reflection structure. Never generate extended reflections for the inputs below.
-    Speak with warmth and encouragement while staying focused on spiritual guidance.
-    For violence: flag + compassionate redirect:  
-    e.g “This sounds like a heavy burden… speaking to a priest could help. Spiritually, what’s on your heart?”
-    1. Vague or Generic Greetings (e.g., “hi,” “hey,” “hello”)
-    If a user says something general or non-substantive, gently welcome them and encourage a faith-centered question. Do not initiate a full reflection.
-    2. Off-Topic or Non-Spiritual Questions (e.g., “What is Python?”, “How do I cook lentils?”)
-    If the question isn’t related to Catholic spirituality, redirect gently with kindness and encouragement.
-    Example responses (rotate for variety):
-    • “This space is here to nourish your soul and support your faith. Do you have a question or reflection you’d like to explore about God or your spiritual life?”
-    • “That’s a great curiosity—but this part of the app is meant to support your heart in matters of faith. Is there something stirring spiritually you’d like to share?”
-    • “I focus on spiritual encouragement and Catholic teaching. If you’d like, we can explore something about your relationship with God or prayer today.”
-    3. Questions About Today’s Mass Readings or Saint of the Day
-    If users ask for daily Mass readings, Bible study, or the Saint of the Day, redirect them to the appropriate section in a caring way.
-    Example responses (rotate for variety):
-    • “This space offers spiritual counsel, but today’s Mass readings and Saint of the Day can be found in the Daily Readings section. Would you like to reflect on something personal in your faith journey here?”
-    • “Daily Readings holds today’s Mass Scripture and Saint reflections. I’m here to walk with you through any questions about your heart or faith.”
-    • “You can find today’s readings and the Saint of the Day in the Daily Readings area. If there’s something on your soul you’d like to explore here, I’d be glad to reflect with you.”
-    4. Repeated Off-Topic or Unclear Inputs
-    If the user continues asking off-topic or unclear questions, continue to respond briefly and gently, with pastoral warmth and gentle redirection. Do not escalate or reflect deeply.
-    Example responses:
-    • “Let’s stay close to what matters most—your heart and God’s love. Want to share something spiritual that’s been on your mind?”
-    • “I’d love to walk with you through a question about faith. What part of your soul feels in need of light or peace today?”
-    5. Blank or Empty Input (e.g., no text or only punctuation)
-    If the user sends a message without content or only symbols (e.g., “…”, “?”), gently invite them to share something meaningful.
-    Example responses (rotate for variety):
-    • “I didn’t catch a message—what’s stirring in your heart today?”
-    • “Feel free to share anything that’s been weighing on your soul or drawing you closer to God.”
-    • “Is there something spiritual you’d like to explore today? I’m here to walk with you.”
-    6. Gibberish, Emojis, or Nonsense Input (e.g., “asdfgh”, “🔥😂💯”)
-    If the input consists of random letters, symbols, or emojis, respond warmly and invite them to reflect on a faith-centered question.
-    Example responses (rotate for variety):
-    • “Let’s bring it back to what matters—your heart and your walk with God. Is something on your soul today?”
-    • “This space is here for meaningful spiritual reflection. Would you like to share something you’ve been thinking about in faith or prayer?”
-    7. Inappropriate Language or Profanity
-    If the user includes profanity or offensive language, respond without judgment, encouraging a respectful tone focused on faith.
-    Example responses (rotate for variety):
-    • “Let’s keep this a space of peace and reverence. If there’s something on your heart that you’d like to bring before God, I’m here to reflect with you.”
-    • “I’m here to support your spiritual journey with love and care. Would you like to explore something meaningful in faith today?”
-    For repeated or severe cases, escalate via the safety protocol outlined in **Safety & sensitive topics Handling**
-    8. Dismissive or Mocking Remarks (e.g., “Religion is dumb”, “God isn’t real”)
-    If the user mocks faith or engages with hostility, respond with charity, rooted in the Church’s love and truth, while maintaining boundaries.
-    Example responses (rotate for variety):
-    • “This space is grounded in the Catholic faith. If you're open to exploring your heart or questions about God, I’d be glad to walk with you.”
-    • “Faith invites honest searching—but this space offers guidance through a Catholic lens. If you'd like to ask something with an open heart, I’m here.”
-
-    Important Rule:
-    These responses must override all normal reflection patterns and come before any doctrinal or pastoral analysis.
-    Do not interpret these types of inputs as invitations to generate full reflections.
-    Respond only with the short, redirect-style replies above, always in a warm, pastoral voice.
-    ---
-    
-    ### **Safety & sensitive topics Handling**:
-    •	Serious Trauma, Severe Mental Health Crisis, or Heavy Pain (e.g., suicidal thoughts, abuse, post-abortion distress): Respond in three parts:
-    1.	Acknowledge Pain: “That sounds like something very heavy to carry. I’m so sorry you’ve experienced this.”
-    2.	Spiritual Encouragement: Include Scripture (e.g., **The Lord is close to the brokenhearted**, Psalm 34:18) and gentle hope, affirming God’s nearness.
-    3.	Invite Support: “You deserve more care than I can offer here. Sometimes, God brings healing through others—a good priest or Catholic counselor could help you walk through this. If you’d like, we can still reflect here together too.”
-    •	Ensure responses remain extended and retreat-like, balancing compassion with spiritual depth.
-    •	Never imply the AI can provide healing or therapy.
-    •	Content Suggesting Harm to Others (e.g., violence):
-    o	Flag for moderator review and respond compassionately: “This sounds like a heavy burden. Speaking with a trusted priest or counselor can offer guidance and support. Is there something spiritual you’d like to explore together?”
-    •	Securely log interactions while preserving privacy and escalate as needed.
-    ---
-    
-    ### **Pastoral memory**:
-    •	Track up to three key spiritual themes (e.g., fear, trust, grief) from user input to tailor reflections, using shared keywords or topics to identify continuity.
-    •	For new users or when no prior themes exist, tailor responses based solely on current input.
-    •	Do not mention themes explicitly; use them subtly to guide tone and Scripture choice.
-    •	Track response count for the same question or topic (based on shared keywords or themes). After two consecutive responses, replace reflective questions with a feedback invitation.
-    •	Clear themes and response count if the user requests a “fresh start,” responding:
-    o	“Your spiritual journey has a fresh start. What’s on your heart today?”
-    •	Comply with all privacy laws (e.g., GDPR, CCPA). Never store personal data.
-    ---
-
-    ### **Final reminders**:
-    Every reflection must leave the user:
-    •	Feeling loved, not judged.
-    •	Feeling safe, not exposed.
-    •	Feeling invited, not pressured.
-    •	Feeling guided toward Christ, not the app.
-    Let your words be a doorway to God’s love, not the destination. The goal is always: God glorified, the user loved, and the soul lifted.
-    ---
-    
-    **User's Input:**  
-    #     {payload.text}
-    #     **Previous Answer:**
-    #     {last_answers}
-    ### **Response structure**:
-    1. **Acknowledgment**: warm, welcoming, avatar’s tone. Make user feel seen & loved. Then blank line.
-    2. **Doctrinal answer** (if doctrinal question): clear, grounded, then pastoral reflection.
-    3. **Pastoral reflection**:
-    - Extended, retreat-like.
-    - Weave in Scripture (**bold** text), Saints, approved miracles.
-    - Imagery, metaphors, poetic language (without overdoing).
-    - Grace-filled invitations: journaling, silence, Lectio Divina, surrender, acts of charity.
-    - Always spiritually substantial, never generic.
-    4. **Closing**:
-    - 1–2 open-ended reflective questions: “What stirred your heart?”
-    - After two consecutive responses to same topic (tracked by pastoral memory using keywords like {Pastoral_theme}), instead use feedback invitation matching avatar:
-        - Thérèse: “Does this feel like a gentle step toward Jesus?”
-        - Pio: “Is this reflection easing your heart’s cross?”
-        - Kim: “Does this light your faith today?”
-        - Dan: “Does this feel steady for your walk?”
-
-    5. **Clickable prompts**:
-    - After a blank line, add two short contextual spiritual question bubbles (5–8 words each) after each response, displayed after the reflective questions or feedback invitation with a single line space.
-    Prompts must:
-    o Build on the reflection’s theme or concern.
-    o Be phrased as spiritual questions (e.g., “How do I offer my pain?”).
-    o Lead the user deeper or wider in faith.
-    Avoid:
-    o Imperatives (e.g., “Pray a Rosary”).
-    o Generic commands (e.g., “Read the Bible”).
-    - E.g., “How do I trust God’s plan?” “Where do I find hope?”
-    ---
-    **Strictly follow this structure. Generate only the final reflection text, in natural English, no headings, exactly as described.**
-    **must not include greeting and welcome sentences if user's input is not greeting words like "hi", "hello" or so**
-    Your response must be in valid JSON, like this:
-
-        '{{
-        "answer": "Your full reply to the user here.",
-        "follow_ups": ["clickable prompt1", "clickable prompt2"]
-        }}'
-
-        Respond only with valid raw JSON, without markdown formatting or code blocks.
-        Do NOT include ```json or ``` in the output.
+    return {
+        "id": str(ai_msg_id),
+        "sender": "ai",
+        "text": fallback,
+        "timestamp": datetime.now().isoformat(),
+        "follow_ups": [],
+    }
+
+
+async def prepare_chat_turn(
+    payload: schemas.NewMessageIn, db: AsyncSession, template: str
+):
+    """
+    Stage the user message and build the counsel messages from the given prompt template.
+    Moderation and theme extraction run concurrently with the DB reads; the moderation
+    task is returned unresolved so the caller can start the completion speculatively.
+    Nothing is written here: the turn's rows are persisted together from the returned uow
+    (or, if anything fails, whatever was staged is saved with uow.save_staged()).
+    Returns (messages, temperature, moderation, uow, user_msg_id, encrypted).
     """
+    moderation = asyncio.create_task(utils.check_openai_moderation(payload.text))
+    themes = asyncio.create_task(utils.extract_themes(payload.text))
+    uow = UnitOfWork()
+    encrypted = utils.encrypt_text(payload.text)
+    user_msg_id = add_message(uow, payload.chat_session_id, payload.sender, encrypted)
+    try:
+        async with timing.span("history"):
+            history = await context.build_history(db, payload.chat_session_id)
+        extracted = await themes
+        async with timing.span("db"):
+            final_themes = await utils.store_themes(payload.user_id, extracted, db, uow)
+            # End the read transaction so no connection is held during the model call.
+            await db.commit()
+    except BaseException:
+        moderation.cancel()
+        themes.cancel()
+        await uow.save_staged()
+        raise
+    user_profile = payload.profile
+    Pastoral_theme = f"{', '.join(final_themes)}." if final_themes else ""
+    age = datetime.now().year - int(user_profile.age_range)
+    messages = prompts.messages(
+        template,
+        utils.normalize_avatar(user_profile.avatar),
+        age=age,
+        gender=user_profile.sex,
+        life_stage=user_profile.life_stage,
+        spiritual_goals=", ".join(user_profile.spiritual_goals),
+        spiritual_maturity=user_profile.spiritual_maturity,
+        themes=Pastoral_theme,
+        history=history,
+        text=payload.text,
+    )
     
     if user_profile.responseStyle == "default":
         temp = 0.6
     else: 
         temp = 0.3
-    print("temperature:", temp)        
-    response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a faithful Catholic scripture companion.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=temp,
-            )
+    return messages, temp, moderation, uow, user_msg_id, encrypted
 
-    ai_response = response.choices[0].message.content
-    # ai_response = await utils.call_llm(prompt)
-    try:
-        parsed = json.loads(ai_response)
-        ai_text = parsed.get("answer", "").strip()
-        follow_ups = parsed.get("follow_ups", [])
-    except Exception:
-        # fallback if parsing fails
-        ai_text = ai_response.strip()
-        follow_ups = []
-    # Save AI message in DB
-    ai_msg = models.Message(
-        id=uuid4(),
-        chat_session_id=payload.chat_session_id,
-        sender="ai",
-        text=utils.encrypt_text(ai_text),
+
+@router.post("/chat/message")
+async def send_message(
+    payload: schemas.NewMessageIn, db: AsyncSession = Depends(get_db)
+):
+    messages, temp, moderation, uow, user_msg_id, encrypted = await prepare_chat_turn(
+        payload, db, "counsel"
     )
-    db.add(ai_msg)
-    await db.commit()
+    # Start the completion speculatively and drop it if moderation flags the input.
+    completion = asyncio.create_task(
+        llm.chat(messages, model="gpt-4o", temperature=temp)
+    )
+    try:
+        try:
+            is_harmful = await moderation
+        except BaseException:
+            completion.cancel()
+            raise
+        if is_harmful:
+            completion.cancel()
+            fallback = flag_chat_turn(payload, user_msg_id, encrypted, uow)
+            async with timing.span("persist"):
+                await uow.persist(db)
+            context.schedule_refresh(payload.chat_session_id)
+            return fallback
+        # Started speculatively, so this is only the part not overlapped by moderation.
+        async with timing.span("completion"):
+            ai_response = await completion
+        try:
+            parsed = json.loads(ai_response)
+            ai_text = parsed.get("answer", "").strip()
+            follow_ups = parsed.get("follow_ups", [])
+        except Exception:
+            # fallback if parsing fails
+            ai_text = ai_response.strip()
+            follow_ups = []
+        # Save the whole turn in one transaction
+        ai_msg_id = add_message(uow, payload.chat_session_id, "ai", utils.encrypt_text(ai_text))
+        async with timing.span("persist"):
+            await uow.persist(db)
+        context.schedule_refresh(payload.chat_session_id)
+    finally:
+        # Keeps the user's message if the completion failed; a no-op once persisted.
+        await uow.save_staged()
 
     return {
-        "id": str(ai_msg.id),
+        "id": str(ai_msg_id),
         "sender": "ai",
         "text": ai_text,
         "timestamp": datetime.now().isoformat(),
@@ -1238,6 +706,77 @@ async def send_message(
     }
 
 
+@router.post("/chat/message/stream")
+async def send_message_stream(
+    payload: schemas.NewMessageIn, db: AsyncSession = Depends(get_db)
+):
+    messages, temp, moderation, uow, user_msg_id, encrypted = await prepare_chat_turn(
+        payload, db, "counsel_stream"
+    )
+    ai_msg_id = uuid4()
+
+    async def event_stream():
+        ai_text = ""
+        tail = ""
+        stream = split_stream(
+            llm.stream_chat(messages, model="gpt-4o", temperature=temp),
+            prompts.FOLLOW_UPS_MARKER,
+        )
+        try:
+            # The completion starts speculatively; nothing is sent until moderation clears it.
+            flagged = None
+            async for kind, chunk in stream:
+                if flagged is None:
+                    flagged = await moderation
+                    if flagged:
+                        break
+                if kind == "tail":
+                    tail += chunk
+                    continue
+                ai_text += chunk
+                yield sse_event("token", {"text": chunk})
+            if flagged is None:
+                flagged = await moderation
+            if flagged:
+                await stream.aclose()
+                fallback = flag_chat_turn(payload, user_msg_id, encrypted, uow)
+                await uow.persist()
+                context.schedule_refresh(payload.chat_session_id)
+                yield sse_event("token", {"text": fallback["text"]})
+                yield sse_event("done", fallback)
+                return
+            try:
+                follow_ups = json.loads(tail) if tail.strip() else []
+            except Exception:
+                follow_ups = []
+            ai_text = ai_text.strip()
+            add_message(uow, payload.chat_session_id, "ai", utils.encrypt_text(ai_text), ai_msg_id)
+            # The request session is closed once streaming starts, so this uses a fresh one.
+            await uow.persist()
+            context.schedule_refresh(payload.chat_session_id)
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        yield sse_event(
+            "done",
+            {
+                "id": str(ai_msg_id),
+                "sender": "ai",
+                "text": ai_text,
+                "timestamp": datetime.now().isoformat(),
+                "follow_ups": follow_ups,
+            },
+        )
+
+    async def cleanup():
+        # Moderation was started before the stream; don't leave it running or unretrieved.
+        discard_task(moderation)
+        # Keeps the user's message if the stream failed or the client left; a no-op once persisted.
+        await uow.save_staged()
+
+    return SSEResponse(event_stream(), cleanup)
+
+
 @router.post("/feedback")
 async def add_feedback(payload: schemas.FeedbackIn, db: AsyncSession = Depends(get_db)):
     fb = models.Feedback(
@@ -1249,11 +788,7 @@ async def add_feedback(payload: schemas.FeedbackIn, db: AsyncSession = Depends(g
     db.add(fb)
     if payload.reaction == "flag":
         # get message text
-        q = await db.execute(
-            models.Message.__table__.select().where(
-                models.Message.id == payload.message_id
-            )
-        )
+        q = await db.execute(crud.message_by_id(payload.message_id))
         row = q.fetchone()
         # text = utils.decrypt_text(row.text) if row else ""
         text = row.text if row else ""
@@ -1269,59 +804,33 @@ async def add_feedback(payload: schemas.FeedbackIn, db: AsyncSession = Depends(g
 
 
 @router.delete("/chat-sessions/user/{user_id}")
-async def delete_user_data(user_id: str, db: AsyncSession = Depends(get_db)):
+async def delete_user_data(
+    user_id: str, background_tasks: BackgroundTasks, background: bool = Query(False)
+):
+    """
+    Delete all of a user's data. With background=true the deletion runs after the response
+    and its progress can be polled at GET /chat-sessions/user/{user_id}/deletion.
+    """
+    if background:
+        claimed, job = await deletion.enqueue(user_id)
+        if claimed:
+            background_tasks.add_task(deletion.run, user_id)
+        return job
     try:
-        # Get all ChatSession IDs for user
-        result = await db.execute(
-            select(models.ChatSession.id).where(models.ChatSession.user_id == user_id)
-        )
-        chat_session_ids = [row[0] for row in result.all()]
-
-        if not chat_session_ids:
-            return {
-                "status": "success",
-                "detail": "No chat sessions found for this user.",
-            }
-
-        # Get all Message IDs in those chat sessions
-        result = await db.execute(
-            select(models.Message.id).where(
-                models.Message.chat_session_id.in_(chat_session_ids)
-            )
-        )
-        message_ids = [row[0] for row in result.all()]
-
-        # Delete Feedback
-        if message_ids:
-            await db.execute(
-                delete(models.Feedback).where(
-                    models.Feedback.message_id.in_(message_ids)
-                )
-            )
-
-            # Delete FlaggedResponse
-            await db.execute(
-                delete(models.FlaggedResponse).where(
-                    models.FlaggedResponse.message_id.in_(message_ids)
-                )
-            )
-
-            # Delete Messages
-            await db.execute(
-                delete(models.Message).where(models.Message.id.in_(message_ids))
-            )
-
-        # Delete ChatSessions
-        await db.execute(
-            delete(models.ChatSession).where(
-                models.ChatSession.id.in_(chat_session_ids)
-            )
-        )
-
-        await db.commit()
-
-        return {"status": "success", "detail": f"Deleted data for user_id={user_id}"}
-
+        counts = await deletion.delete_user_data(user_id)
     except Exception as e:
-        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Deletion failed: {str(e)}")
+    if not counts["chat_sessions"]:
+        return {
+            "status": "success",
+            "detail": "No chat sessions found for this user.",
+        }
+    return {"status": "success", "detail": f"Deleted data for user_id={user_id}"}
+
+
+@router.get("/chat-sessions/user/{user_id}/deletion")
+async def get_deletion_status(user_id: str):
+    job = await deletion.status(user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No deletion found for this user.")
+    return job
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import time
+from uuid import uuid4
+
+from fastapi_cache import FastAPICache
+
+import llm
+import utils
+
+# How long a lock outlives a crashed holder. A live holder keeps extending it while it
+# generates, so this doesn't have to cover a slow generation.
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.getenv("SINGLE_FLIGHT_LOCK_TIMEOUT", "120"))
+# Waiters give up and generate locally after this. The default covers a model call that
+# times out on every attempt (the SDK backs off at most 8s between retries).
+SINGLE_FLIGHT_WAIT_TIMEOUT = float(
+    os.getenv(
+        "SINGLE_FLIGHT_WAIT_TIMEOUT",
+        str(llm.LLM_TIMEOUT * (llm.LLM_MAX_RETRIES + 1) + 8 * llm.LLM_MAX_RETRIES + 10),
+    )
+)
+SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv("SINGLE_FLIGHT_POLL_INTERVAL", "1"))
+
+# Delete the lock only if we still own it, so a slow generator can't release someone else's lock.
+RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+EXTEND_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def _redis():
+    return FastAPICache.get_backend().redis
+
+
+async def _keep_lock(redis, lock_key: str, token: str):
+    # Extend the lock while we still own it, until cancelled once produce() is done.
+    while True:
+        await asyncio.sleep(SINGLE_FLIGHT_LOCK_TIMEOUT / 3)
+        try:
+            if not await redis.eval(EXTEND_LOCK, 1, lock_key, token, SINGLE_FLIGHT_LOCK_TIMEOUT):
+                return
+        except Exception as e:
+            print(f"single-flight could not extend {lock_key}:", e)
+
+
+async def get_or_generate(key: str, produce, expire: int = 60 * 60 * 48):
+    """
+    Return the cached value for key, generating it at most once across all workers on a miss.
+    The worker holding the lock runs produce() and stores the result; everyone else waits on
+    a pub/sub channel for it. The holder extends its lock while it generates; locks expire
+    so a crashed generator can't wedge the key.
+    """
+    cached = await utils.get_cache(key)
+    if cached:
+        return cached
+
+    redis = _redis()
+    lock_key = f"lock:{key}"
+    channel = f"ready:{key}"
+    deadline = time.monotonic() + SINGLE_FLIGHT_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        token = uuid4().hex
+        if await redis.set(lock_key, token, nx=True, ex=SINGLE_FLIGHT_LOCK_TIMEOUT):
+            keeper = asyncio.create_task(_keep_lock(redis, lock_key, token))
+            try:
+                # Another worker may have finished between our cache check and taking the lock.
+                cached = await utils.get_cache(key)
+                if cached:
+                    return cached
+                value = await produce()
+                await utils.set_cache(key, value, expire=expire)
+                await redis.publish(channel, "1")
+                return value
+            finally:
+                keeper.cancel()
+                await redis.eval(RELEASE_LOCK, 1, lock_key, token)
+
+        cached = await _wait_for_result(redis, key, lock_key, channel, deadline)
+        if cached:
+            return cached
+        # The lock went away without a result (generator failed or crashed): try to take over.
+
+    print(f"single-flight wait timed out for {key}, generating locally")
+    return await produce()
+
+
+async def _wait_for_result(redis, key: str, lock_key: str, channel: str, deadline: float):
+    pubsub = redis.pubsub()
+    await pubsub.subscribe(channel)
+    try:
+        while time.monotonic() < deadline:
+            # Check after subscribing so a publish that raced the subscribe isn't missed.
+            cached = await utils.get_cache(key)
+            if cached:
+                return cached
+            if not await redis.exists(lock_key):
+                return None
+            await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=min(SINGLE_FLIGHT_POLL_INTERVAL, max(deadline - time.monotonic(), 0)),
+            )
+        return None
+    finally:
+        await pubsub.unsubscribe(channel)
+        await pubsub.close()
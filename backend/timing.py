@@ -0,0 +1,107 @@
+import json
+import os
+import time
+from contextvars import ContextVar
+
+import metrics
+
+# Send a Server-Timing header with the per-phase breakdown of each response.
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() == "true"
+# Requests slower than this are logged with their phases as one JSON line; 0 disables it.
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+# Phase name -> accumulated seconds for the request being handled.
+_spans = ContextVar("spans", default=None)
+
+
+class span:
+    """
+    Time a phase of the current request, with `with span("db"):` or `async with span("db"):`.
+    Repeated phases add up. Outside a request it records nothing.
+    """
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        spans = _spans.get()
+        if spans is not None:
+            spans[self.name] = spans.get(self.name, 0.0) + time.perf_counter() - self.start
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        self.__exit__(*exc)
+
+
+def server_timing(spans: dict, total: float) -> str:
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in spans.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware collecting the request's spans into a Server-Timing header and, above
+    SLOW_REQUEST_MS, a slow-request log line. Streamed responses send their headers before
+    the body, so their header only covers the phases up to the first byte; the log covers
+    the whole request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        spans = {}
+        token = _spans.set(spans)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    header = server_timing(spans, time.perf_counter() - start)
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", []),
+                            (b"server-timing", header.encode()),
+                            # Lets cross-origin pages read the timings too (CORS allows any origin).
+                            (b"timing-allow-origin", b"*"),
+                        ],
+                    }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _spans.reset(token)
+            total = (time.perf_counter() - start) * 1000
+            if SLOW_REQUEST_MS and total >= SLOW_REQUEST_MS:
+                print(
+                    json.dumps(
+                        {
+                            "event": "slow_request",
+                            "method": scope["method"],
+                            "path": scope["path"],
+                            "endpoint": metrics.current_endpoint.get(),
+                            "status": status,
+                            "duration_ms": round(total, 1),
+                            "spans_ms": {
+                                name: round(seconds * 1000, 1) for name, seconds in spans.items()
+                            },
+                        }
+                    )
+                )
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import TIMESTAMP
+from sqlalchemy.dialects.postgresql import UUID, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from cache import redis
+from db import AsyncSessionLocal
+
+# Opt-in: reply first and let the background writer persist the turn.
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "false").lower() == "true"
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "50"))
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "10"))
+WRITE_BEHIND_POLL = float(os.getenv("WRITE_BEHIND_POLL", "5"))
+
+WRITE_BEHIND_HEARTBEAT_TTL = int(os.getenv("WRITE_BEHIND_HEARTBEAT_TTL", "60"))
+
+WRITE_BEHIND_QUEUE = "writebehind:queue"
+WRITE_BEHIND_DEAD = "writebehind:dead"
+# Each writer moves the units it is writing to its own processing list, and refreshes
+# its heartbeat while running. A processing list without a heartbeat is orphaned.
+WRITE_BEHIND_PROCESSING_PREFIX = "writebehind:processing:"
+WRITE_BEHIND_HEARTBEAT_PREFIX = "writebehind:heartbeat:"
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+WRITE_BEHIND_PROCESSING = WRITE_BEHIND_PROCESSING_PREFIX + WORKER_ID
+WRITE_BEHIND_HEARTBEAT = WRITE_BEHIND_HEARTBEAT_PREFIX + WORKER_ID
+
+# Saves started by save_staged that outlive their (cancelled) request.
+_saving = set()
+
+
+class UnitOfWork:
+    """
+    The rows one request writes, persisted together in a single transaction.
+    Inserts carry their own primary keys and skip rows that already exist, so replaying
+    a unit (after a write-behind crash) is harmless.
+    """
+
+    def __init__(self, ops: list = None, attempts: int = 0):
+        self.ops = ops or []
+        self.attempts = attempts
+
+    def insert(self, model, **values):
+        self.ops.append({"table": model.__tablename__, "values": values})
+
+    def upsert(self, model, conflict: list, update: list, **values):
+        self.ops.append(
+            {"table": model.__tablename__, "values": values, "conflict": conflict, "update": update}
+        )
+
+    def _statements(self):
+        # Consecutive plain inserts into the same table go out as one multi-row INSERT.
+        pending = []
+        for op in self.ops + [None]:
+            if pending and (
+                op is None
+                or "conflict" in op
+                or op["table"] != pending[0]["table"]
+                or op["values"].keys() != pending[0]["values"].keys()
+            ):
+                table = models.Base.metadata.tables[pending[0]["table"]]
+                yield insert(table).values([p["values"] for p in pending]).on_conflict_do_nothing()
+                pending = []
+            if op is None:
+                break
+            if "conflict" in op:
+                statement = insert(models.Base.metadata.tables[op["table"]]).values(op["values"])
+                yield statement.on_conflict_do_update(
+                    index_elements=op["conflict"],
+                    set_={column: statement.excluded[column] for column in op["update"]},
+                )
+            else:
+                pending.append(op)
+
+    async def execute(self, db: AsyncSession):
+        for statement in self._statements():
+            await db.execute(statement)
+
+    async def commit(self, db: AsyncSession):
+        await self.execute(db)
+        await db.commit()
+
+    async def persist(self, db: AsyncSession = None):
+        """
+        Write the unit now, or queue it for the background writer in write-behind mode.
+        Pass db to reuse the request session; otherwise a fresh session is used.
+        """
+        if not self.ops:
+            return
+        if WRITE_BEHIND:
+            await redis.lpush(WRITE_BEHIND_QUEUE, self.dumps())
+        elif db is None:
+            async with AsyncSessionLocal() as session:
+                await self.commit(session)
+        else:
+            await self.commit(db)
+        # Persisted: a later persist or save_staged is a no-op.
+        self.ops = []
+
+    async def save_staged(self):
+        """
+        Persist whatever is staged when a request fails or its client goes away, so the
+        user's message is kept even without a reply. Runs on a fresh session and finishes
+        even if the caller is cancelled. Errors are logged, not raised.
+        """
+        if not self.ops:
+            return
+        task = asyncio.create_task(self.persist())
+        _saving.add(task)
+        task.add_done_callback(_saving.discard)
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print("failed to save staged rows:", e)
+
+    def dumps(self) -> str:
+        return json.dumps({"ops": self.ops, "attempts": self.attempts}, default=str)
+
+    @classmethod
+    def loads(cls, raw: str) -> "UnitOfWork":
+        data = json.loads(raw)
+        for op in data["ops"]:
+            table = models.Base.metadata.tables[op["table"]]
+            for column, value in op["values"].items():
+                if not isinstance(value, str):
+                    continue
+                if isinstance(table.c[column].type, UUID):
+                    op["values"][column] = uuid.UUID(value)
+                elif isinstance(table.c[column].type, TIMESTAMP):
+                    op["values"][column] = datetime.fromisoformat(value)
+        return cls(data["ops"], data["attempts"])
+
+
+async def _write_batch(batch: list):
+    units = [UnitOfWork.loads(raw) for raw in batch]
+    failed = []
+    try:
+        async with AsyncSessionLocal() as session:
+            for unit in units:
+                await unit.execute(session)
+            await session.commit()
+    except Exception:
+        # Retry one at a time so a bad unit doesn't hold back the rest.
+        for raw, unit in zip(batch, units):
+            try:
+                async with AsyncSessionLocal() as session:
+                    await unit.commit(session)
+            except Exception as e:
+                print(f"write-behind unit failed (attempt {unit.attempts + 1}): {e!r}")
+                failed.append((raw, unit))
+    async with redis.pipeline(transaction=True) as pipe:
+        for raw, unit in failed:
+            unit.attempts += 1
+            target = WRITE_BEHIND_DEAD if unit.attempts >= WRITE_BEHIND_MAX_ATTEMPTS else WRITE_BEHIND_QUEUE
+            pipe.lpush(target, unit.dumps())
+        for raw in batch:
+            pipe.lrem(WRITE_BEHIND_PROCESSING, 1, raw)
+        await pipe.execute()
+    if failed:
+        await asyncio.sleep(min(2 ** max(unit.attempts for _, unit in failed), 60))
+
+
+async def _heartbeat():
+    while True:
+        try:
+            await redis.set(WRITE_BEHIND_HEARTBEAT, "1", ex=WRITE_BEHIND_HEARTBEAT_TTL)
+        except Exception as e:
+            print("write-behind heartbeat failed:", e)
+        await asyncio.sleep(WRITE_BEHIND_HEARTBEAT_TTL / 3)
+
+
+async def _requeue(processing: str):
+    # Oldest first, so replays keep their original order.
+    while await redis.lmove(processing, WRITE_BEHIND_QUEUE, "LEFT", "RIGHT"):
+        pass
+
+
+async def recover_orphans():
+    """
+    Re-queue the units left mid-write by writers that are no longer running (their
+    heartbeat expired). Live writers' lists, this one's included, are left alone.
+    """
+    async for key in redis.scan_iter(match=f"{WRITE_BEHIND_PROCESSING_PREFIX}*"):
+        worker = key[len(WRITE_BEHIND_PROCESSING_PREFIX):]
+        if not await redis.exists(WRITE_BEHIND_HEARTBEAT_PREFIX + worker):
+            await _requeue(key)
+
+
+async def run_writer():
+    """
+    Drain the write-behind queue into Postgres in batches. Runs for the lifetime of the app.
+    """
+    heartbeat = asyncio.create_task(_heartbeat())
+    try:
+        await _drain()
+    finally:
+        heartbeat.cancel()
+
+
+async def _drain():
+    # A previous process with this host and pid is gone, so its list is replayed first.
+    await _requeue(WRITE_BEHIND_PROCESSING)
+    await redis.set(WRITE_BEHIND_HEARTBEAT, "1", ex=WRITE_BEHIND_HEARTBEAT_TTL)
+    await recover_orphans()
+    last_recovery = time.monotonic()
+    while True:
+        try:
+            # Writers that died since startup leave orphans too.
+            if time.monotonic() - last_recovery > WRITE_BEHIND_HEARTBEAT_TTL:
+                await recover_orphans()
+                last_recovery = time.monotonic()
+            raw = await redis.blmove(
+                WRITE_BEHIND_QUEUE, WRITE_BEHIND_PROCESSING, WRITE_BEHIND_POLL, "RIGHT", "LEFT"
+            )
+            if raw is None:
+                continue
+            batch = [raw]
+            while len(batch) < WRITE_BEHIND_BATCH:
+                raw = await redis.lmove(WRITE_BEHIND_QUEUE, WRITE_BEHIND_PROCESSING, "RIGHT", "LEFT")
+                if raw is None:
+                    break
+                batch.append(raw)
+            await _write_batch(batch)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print("write-behind writer error:", e)
+            await asyncio.sleep(1)
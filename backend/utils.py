@@ -1,9 +1,11 @@
 import os
+from uuid import uuid4
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import LRUCache
 from fastapi import Depends
 from cryptography.fernet import Fernet
-from openai import OpenAI
-from sqlalchemy import text
-import requests
 import json
 from datetime import datetime, date, timezone, timedelta
 from bs4 import BeautifulSoup
@@ -18,12 +20,42 @@ from fastapi_cache import FastAPICache
 from db import AsyncSessionLocal
 import json
 import html
+import unicodedata
 from zoneinfo import ZoneInfo
 from models import PastoralMemory
+import llm
+import local_cache
+import cache
+import pastoral_themes
+import prompts
+import analytics
+import metrics
+import timing
+from unit_of_work import UnitOfWork
 
 AES_KEY = os.getenv("AES_SECRET_KEY").encode()
 fernet = Fernet(AES_KEY)
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+DECRYPT_CACHE_SIZE = int(os.getenv("DECRYPT_CACHE_SIZE", "20000"))
+DECRYPT_OFFLOAD_THRESHOLD = int(os.getenv("DECRYPT_OFFLOAD_THRESHOLD", "32"))
+DECRYPT_CHUNK_SIZE = int(os.getenv("DECRYPT_CHUNK_SIZE", "64"))
+DECRYPT_WORKERS = int(os.getenv("DECRYPT_WORKERS", "4"))
+
+# Only touched from the event loop; workers just decrypt.
+_decrypted = LRUCache(maxsize=DECRYPT_CACHE_SIZE)
+_decrypt_executor = ThreadPoolExecutor(max_workers=DECRYPT_WORKERS, thread_name_prefix="decrypt")
+
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "15"))
+FETCH_STEP_TIMEOUT = float(os.getenv("FETCH_STEP_TIMEOUT", "30"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "3"))
+FETCH_RETRY_BACKOFF = float(os.getenv("FETCH_RETRY_BACKOFF", "2"))
+
+# Shared pool for the daily job's outbound fetches (Universalis, calendar API).
+http_client = httpx.AsyncClient(
+    timeout=FETCH_TIMEOUT,
+    follow_redirects=True,
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+)
 
 avatarOption = [
     {
@@ -59,6 +91,18 @@ def get_avatar_name(name: str) -> str:
     return ""
 
 
+def normalize_avatar(name: str) -> str:
+    """
+    Map a client-supplied avatar name (any case, with or without accents) to its avatarOption name.
+    """
+    folded = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode().lower()
+    for avatar in avatarOption:
+        canonical = unicodedata.normalize("NFKD", avatar["name"]).encode("ascii", "ignore").decode()
+        if canonical.lower() == folded.strip():
+            return avatar["name"]
+    return "Pio"
+
+
 def get_spirituality_stage(spiritual_maturity: float) -> str:
     if spiritual_maturity < 1.8:
         return "Exploring"
@@ -69,122 +113,145 @@ def get_spirituality_stage(spiritual_maturity: float) -> str:
 
 
 def encrypt_text(plain: str) -> str:
-    return fernet.encrypt(plain.encode()).decode()
+    with timing.span("crypto"):
+        return fernet.encrypt(plain.encode()).decode()
 
 
 def decrypt_text(cipher: str) -> str:
     return fernet.decrypt(cipher.encode()).decode()
 
 
-async def call_llm(prompt: str) -> str:
-    response = client.chat.completions.create(
-        model="gpt-4o", messages=[{"role": "system", "content": prompt}],
-    )
-    return response.choices[0].message.content.strip()
+def _decrypt_batch(ciphers: list) -> list:
+    return [decrypt_text(cipher) for cipher in ciphers]
 
 
-async def log_analytics(db, user_id: str, event: str, data: dict):
-    # await db.execute(
-    #     "INSERT INTO analytics_events (user_id, event_type, data) VALUES (:uid, :evt, :d)",
-    #     {"uid": user_id, "evt": event, "d": data}
-    # )
-    await db.execute(
-        text(
-            "INSERT INTO analytics_events (user_id, event_type, data) VALUES (:uid, :evt, :d)"
-        ),
-        {"uid": user_id, "evt": event, "d": data},
-    )
+async def decrypt_messages(items: list) -> list:
+    """
+    Decrypt (message_id, cipher) pairs, returning plaintexts in the same order.
+    Messages are immutable, so plaintexts are kept in an LRU keyed by message id.
+    Large batches are split across the decrypt worker pool instead of running on the loop.
+    """
+    results = [None] * len(items)
+    missing = []
+    for index, (message_id, cipher) in enumerate(items):
+        plain = _decrypted.get(message_id)
+        if plain is None:
+            missing.append(index)
+        else:
+            results[index] = plain
+    if not missing:
+        return results
+    ciphers = [items[index][1] for index in missing]
+    async with timing.span("crypto"):
+        if len(ciphers) < DECRYPT_OFFLOAD_THRESHOLD:
+            plains = _decrypt_batch(ciphers)
+        else:
+            loop = asyncio.get_running_loop()
+            chunks = [
+                ciphers[i : i + DECRYPT_CHUNK_SIZE]
+                for i in range(0, len(ciphers), DECRYPT_CHUNK_SIZE)
+            ]
+            parts = await asyncio.gather(
+                *(loop.run_in_executor(_decrypt_executor, _decrypt_batch, chunk) for chunk in chunks)
+            )
+            plains = [plain for part in parts for plain in part]
+    for index, plain in zip(missing, plains):
+        results[index] = plain
+        _decrypted[items[index][0]] = plain
+    return results
 
 
-async def fetch_daily_data(db: AsyncSession = Depends(get_db)):
-    today = datetime.now(ZoneInfo("Pacific/Kiritimati")).date()
-    print(
-        f"Fetching daily data for {str(today)}",
-        datetime.now(ZoneInfo("Pacific/Kiritimati")),
-    )
-    key = f"mass:{today}"
-    cached = await get_cache(key)
-    print(f"Cached data for {key}: {cached}")
-    async with AsyncSessionLocal() as session:
-        existing = await get_reading_by_date(str(today), session)
-        if existing:
-            return
-        today_str = today.strftime("%Y-%m-%d")
-        url_str = today.strftime("%Y%m%d")
-        print("today str in kiritimati===>", url_str)
-        url = f"https://universalis.com/{url_str}/jsonpmass.htm"
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-
-            # Remove JSONP callback wrapper
-            text = response.text.strip()
-            if text.startswith("universalisCallback(") and text.endswith(");"):
-                raw_json = text[len("universalisCallback(") : -2]
-                # print(f"Raw JSONP response: {raw_json}")
-            else:
-                raise RuntimeError("Unexpected Universalis response format")
+async def call_llm(messages: list) -> str:
+    response = await llm.chat(messages, model="gpt-4o")
+    return response.strip()
 
-            data = json.loads(raw_json)
-            season = data.get("season", "")
-            season_week = data.get("season_week", "") or data.get("week", "")
-            first_reading = clean_reading_text(
-                data.get("Mass_R1", {}).get("source", "")
-            )
-            gospel_reading = clean_reading_text(
-                data.get("Mass_G", {}).get("source", "")
-            )
-            psalm_reading = clean_reading_text(
-                data.get("Mass_Ps", {}).get("source", "")
-            )
-            second_reading = clean_reading_text(
-                data.get("Mass_R2", {}).get("source", "")
-            )
 
-        except Exception as e:
-            raise RuntimeError(f"Failed to fetch Mass readings: {e}")
-        saint_name = fetch_todays_saint(url_str)
-        # Scrape data
-        # Parse your data
-        today_str1 = today.strftime("%Y/%m/%d")
-        try:
-            url = f"http://calapi.inadiutorium.cz/api/v0/en/calendars/general-en/{today_str1}"
-            response = requests.get(url)
-            response.raise_for_status()
+def log_analytics(user_id: str, event: str, data: dict):
+    # Buffered and written in bulk by the analytics flusher; see analytics.py.
+    analytics.log(user_id, event, data)
+
 
-            data = response.json()
-            season = data.get("season", "")
-            season_week = data.get("season_week", "")
+async def with_retries(step: str, func, *args, retries: int = None, timeout: float = None):
+    """
+    Await func(*args) with a per-attempt timeout, retrying with exponential backoff.
+    """
+    retries = retries or FETCH_RETRIES
+    timeout = timeout or FETCH_STEP_TIMEOUT
+    for attempt in range(1, retries + 1):
+        try:
+            return await asyncio.wait_for(func(*args), timeout)
         except Exception as e:
-            raise RuntimeError(f"Failed to fetch calendar data: {e}")
-        year = get_liturgical_year_letter(today)
-        # date_obj = datetime.strptime(today_str, "%Y-%m-%d").date()
-        data = {
-            "date": today_str,
-            "saint": saint_name,
-            "season": season,
-            "season_week": str(season_week),
-            "year": year,
-            "first": first_reading,
-            "gospel": gospel_reading,
-            "psalm": psalm_reading,
-            "second": second_reading,
-        }
-        print("daily readings==>", data)
-        await save_reading(session, data)
-        key = f"mass:{today}"
-        await set_cache(key, data)
-        await set_reading_data(today_str, "First Reading", first_reading)
-        await set_reading_data(today_str, "Second Reading", second_reading)
-        await set_reading_data(today_str, "Responsorial Psalm", psalm_reading)
-        await set_reading_data(today_str, "Gospel Reading", gospel_reading)
-        await set_saint_data(today_str, saint_name)
-        # await FastAPICache.set(key, data, expire=60 * 60 * 48)  # Cache for 24 hours
-
-
-def fetch_todays_saint(url_str):
+            if attempt == retries:
+                raise
+            delay = FETCH_RETRY_BACKOFF * 2 ** (attempt - 1)
+            print(f"{step} failed (attempt {attempt}/{retries}): {e!r}; retrying in {delay}s")
+            await asyncio.sleep(delay)
+
+
+async def fetch_universalis_mass(url_str: str) -> dict:
+    url = f"https://universalis.com/{url_str}/jsonpmass.htm"
+    response = await http_client.get(url)
+    response.raise_for_status()
+
+    # Remove JSONP callback wrapper
+    text = response.text.strip()
+    if text.startswith("universalisCallback(") and text.endswith(");"):
+        raw_json = text[len("universalisCallback(") : -2]
+    else:
+        raise RuntimeError("Unexpected Universalis response format")
+    return json.loads(raw_json)
+
+
+async def fetch_liturgical_calendar(day: date) -> dict:
+    url = f"http://calapi.inadiutorium.cz/api/v0/en/calendars/general-en/{day.strftime('%Y/%m/%d')}"
+    response = await http_client.get(url)
+    response.raise_for_status()
+    return response.json()
+
+
+async def fetch_mass_data(day: date) -> dict:
+    """
+    Fetch the Mass readings, saint and liturgical season for a day from the upstream sources.
+    """
+    day_str = day.strftime("%Y-%m-%d")
+    url_str = day.strftime("%Y%m%d")
+    mass, saint_name, calendar = await asyncio.gather(
+        with_retries("Mass readings", fetch_universalis_mass, url_str),
+        with_retries("Saint of the day", fetch_todays_saint, url_str),
+        with_retries("Liturgical calendar", fetch_liturgical_calendar, day),
+        return_exceptions=True,
+    )
+    if isinstance(mass, Exception):
+        raise RuntimeError(f"Failed to fetch Mass readings: {mass}")
+    if isinstance(saint_name, Exception):
+        print(f"Failed to fetch saint of the day: {saint_name}")
+        saint_name = ""
+    season = mass.get("season", "")
+    season_week = mass.get("season_week", "") or mass.get("week", "")
+    if isinstance(calendar, Exception):
+        # Keep the Universalis season data rather than losing the whole day.
+        print(f"Failed to fetch calendar data: {calendar}")
+    else:
+        season = calendar.get("season", "")
+        season_week = calendar.get("season_week", "")
+    data = {
+        "date": day_str,
+        "saint": saint_name,
+        "season": season,
+        "season_week": str(season_week),
+        "year": get_liturgical_year_letter(day),
+        "first": clean_reading_text(mass.get("Mass_R1", {}).get("source", "")),
+        "gospel": clean_reading_text(mass.get("Mass_G", {}).get("source", "")),
+        "psalm": clean_reading_text(mass.get("Mass_Ps", {}).get("source", "")),
+        "second": clean_reading_text(mass.get("Mass_R2", {}).get("source", "")),
+    }
+    print("daily readings==>", data)
+    return data
+
+
+async def fetch_todays_saint(url_str):
     url = f"https://universalis.com/{url_str}/today.htm"
-    response = requests.get(url, timeout=10)
+    response = await http_client.get(url)
     response.raise_for_status()
 
     soup = BeautifulSoup(response.text, "html.parser")
@@ -232,226 +299,222 @@ def get_liturgical_year_letter(today=None):
 
 
 async def set_reading_data(date_str: str, reading_title: str, scripture_reference: str):
+    reading_output = await generate_reading_data(reading_title, scripture_reference)
+    key = f"{date_str}:{reading_title}"
+    await set_cache(key, reading_output)
 
+
+async def generate_reading_data(reading_title: str, scripture_reference: str) -> str:
     try:
-        prompt = f"""
-        You are a Catholic spiritual companion inside the Bible Study Tab of a Catholic app.
-        Your task is to produce a Scripture reading output that follows these requirements:
-
-        - Use the ESV Catholic Edition (preferred). If unavailable, use NABRE or RSV‑CE.
-        - Maintain a reverent, faithful-to-doctrine tone, without additional commentary.
-        - Format the output exactly as:
-        1. Reading title in ALL CAPS (e.g., “FIRST READING” or “GOSPEL”) — use: {reading_title}.
-        2. Scripture reference — use: {scripture_reference}.
-        3. A one-sentence overview briefly summarizing what the passage contains.
-        4. The full text of the passage, formatted so that:
-            - Each verse starts on a new line.
-            - Verse numbers appear in parentheses at the start of each line.
-            - Verse text itself is in bold (use actual font styling, not markdown asterisks).
-        - Do NOT include commentary, footnotes, headings, or cross-references.
-        - Keep formatting faithful to the translation’s style.
-
-        Now, produce only the Scripture reading output in this format using these inputs:
-        - reading_title: "{reading_title}"
-        - scripture_reference: "{scripture_reference}"
-        """
-        response = client.chat.completions.create(
+        return await llm.chat(
+            prompts.messages(
+                "reading",
+                reading_title=reading_title,
+                scripture_reference=scripture_reference,
+            ),
             model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a faithful Catholic scripture companion.",
-                },
-                {"role": "user", "content": prompt},
-            ],
             temperature=0.5,
         )
 
-        reading_output = response.choices[0].message.content
-        key = f"{date_str}:{reading_title}"
-        await set_cache(key, reading_output)
-
     except Exception as e:
         raise RuntimeError(f"Failed to fetch first reading data: {e}")
 
 
 async def set_saint_data(date_str: str, saint_name: str):
+    avatars = [avatar["name"] for avatar in avatarOption]
+    outputs = await asyncio.gather(
+        *(generate_saint_data(saint_name, avatar) for avatar in avatars)
+    )
+    for avatar, reading_output in zip(avatars, outputs):
+        await set_cache(saint_cache_key(date_str, avatar), reading_output)
+
+
+def saint_cache_key(date_str: str, avatar: str) -> str:
+    return f"saint:{date_str}:{normalize_avatar(avatar)}"
+
+
+async def generate_saint_data(saint_name: str, avatar: str = "Pio") -> str:
     try:
-        prompt = f"""
-        You are a Catholic spiritual companion inside a mobile app. The app provides users with daily educational reflections about a saint.
-        When given a saint's name and an avatar name (Pio, Therese, Kim, or Dan), generate a brief, structured response about the saint in the voice of the avatar.
-
-        Use a reverent, educational, and pastoral tone. Do not include personal intentions or casual/slang language.
-        Do not impersonate the saint or avatar. Ensure all facts are historically accurate and consistent with Catholic tradition.
-
-        Format:
-        1. Start with the saint's name in **bold**.
-        2. A 2-sentence overview of who the saint is and why they're significant in **bold**.
-        3. 3 sentences about their time period, origin, and historical context in **bold**.
-        4. 3–4 sentences about their key works, teachings, and notable quotes in **bold**.
-        5. A 3–4 sentence prayer of intercession in **bold**. For Pio and Therese, reference Mary. For Kim and Dan, include patronage or a relevant saint. End with: “Saint [Name], pray for us. Amen.” in **bold**
-
-        Saint: {saint_name}
-        Avatar: Pio
-        """
-        response = client.chat.completions.create(
+        return await llm.chat(
+            prompts.messages("saint", normalize_avatar(avatar), saint_name=saint_name),
             model="gpt-4-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a faithful Catholic scripture companion.",
-                },
-                {"role": "user", "content": prompt},
-            ],
             temperature=0.7,
             max_tokens=600,
         )
 
-        reading_output = response.choices[0].message.content
-        key = f"saint:{date_str}"
-        await set_cache(key, reading_output)
-
     except Exception as e:
         raise RuntimeError(f"Failed to fetch saint data: {e}")
 
 
+# Onboarding life stages grouped into the buckets Bible study content is shared across.
+LIFE_STAGE_GROUPS = {
+    "single": "single",
+    "engaged": "single",
+    "widowed": "single",
+    "divorced or separated": "single",
+    "married": "married",
+    "married with children": "parent",
+    "religious (priest, brother, sister, nun)": "religious",
+    "in consecrated or lay vocation": "religious",
+}
+
+LIFE_STAGE_LABELS = {
+    "single": "Single",
+    "married": "Married",
+    "parent": "Married with children",
+    "religious": "Religious or consecrated life",
+    "general": "Not specified",
+}
+
+# Onboarding spiritual-maturity answers mapped onto get_spirituality_stage's buckets.
+SPIRITUAL_MATURITY_STAGES = {
+    "curious & exploring": "Exploring",
+    "beginning the journey": "Exploring",
+    "returning & reconnecting": "Exploring",
+    "in a season of doubt or dryness": "Exploring",
+    "growing & learning": "Growing",
+    "rooted & trusting": "Mature",
+    "leading & discipling": "Mature",
+}
+
+BIBLE_SEGMENT_HITS_KEY = "bible:segment_hits"
+# Segment hits are counted in process and added to Redis this often (see flush_segment_hits).
+SEGMENT_HITS_FLUSH_INTERVAL = int(os.getenv("SEGMENT_HITS_FLUSH_INTERVAL", "30"))
+_segment_hits = Counter()
+
+
+def get_profile_segment(profile) -> tuple:
+    """
+    Reduce a user profile to the (avatar, spirituality stage, life stage group) it shares content with.
+    """
+    maturity = (profile.spiritual_maturity or "").strip()
+    try:
+        stage = get_spirituality_stage(float(maturity))
+    except ValueError:
+        stage = SPIRITUAL_MATURITY_STAGES.get(maturity.lower(), "Growing")
+    life_stage = LIFE_STAGE_GROUPS.get((profile.life_stage or "").strip().lower(), "general")
+    return normalize_avatar(profile.avatar), stage, life_stage
+
+
+def bible_study_cache_key(date_str: str, reading_title: str, segment: tuple) -> str:
+    return f"reading:{date_str}:{reading_title}:{'|'.join(segment)}"
+
+
+def record_segment_hit(segment: tuple):
+    # Only ranks segments for prefetch, so it stays off the request path.
+    _segment_hits["|".join(segment)] += 1
+
+
+async def flush_segment_hits():
+    """
+    Add the hits counted since the last flush to the Redis ranking, one round trip in all.
+    On failure the counts are kept for the next flush.
+    """
+    if not _segment_hits:
+        return
+    hits = dict(_segment_hits)
+    _segment_hits.clear()
+    try:
+        async with FastAPICache.get_backend().redis.pipeline(transaction=False) as pipe:
+            for member, count in hits.items():
+                pipe.zincrby(BIBLE_SEGMENT_HITS_KEY, count, member)
+            await pipe.execute()
+    except Exception as e:
+        _segment_hits.update(hits)
+        print("failed to record segment hits:", e)
+
+
+async def top_segments(limit: int) -> list:
+    redis = FastAPICache.get_backend().redis
+    members = await redis.zrevrange(BIBLE_SEGMENT_HITS_KEY, 0, limit - 1)
+    return [tuple(member.split("|")) for member in members]
+
+
+async def generate_bible_study(scripture_reference: str, segment: tuple) -> str:
+    avatar, stage, life_stage = segment
+    try:
+        return await llm.chat(
+            prompts.messages(
+                "bible_study",
+                avatar,
+                life_stage=LIFE_STAGE_LABELS[life_stage],
+                stage=stage,
+                scripture_reference=scripture_reference,
+            ),
+            model="gpt-4o",
+            temperature=0.6,
+        )
+
+    except Exception as e:
+        raise RuntimeError(f"Failed to generate Bible study: {e}")
+
+
 async def set_cache(key: str, value: str, expire: int = 60 * 60 * 48):
     """
     Manually set a cache value.
     """
-    backend = FastAPICache.get_backend()
-    json_data = json.dumps(value)
-
-    await backend.set(key, json_data, expire=expire)
+    async with metrics.timed(
+        metrics.CACHE_OPERATIONS, namespace=metrics.namespace(key), operation="set"
+    ):
+        await cache.set_value(key, value, expire)
+    local_cache.put(key, value)
+    await local_cache.publish_invalidation(cache.redis, key)
 
 
 async def get_cache(key: str):
     """
-    Manually get a cache value.
+    Manually get a cache value, checking the in-process cache before Redis.
     """
-    backend = FastAPICache.get_backend()
-    cached = await backend.get(key)
+    namespace = metrics.namespace(key)
+    cached = local_cache.get(key)
     if cached is not None:
-        return json.loads(cached)
-    return None
+        metrics.CACHE_LOOKUPS.labels(namespace, "local_hit").inc()
+        return cached
+    async with metrics.timed(metrics.CACHE_OPERATIONS, namespace=namespace, operation="get"):
+        value = await cache.get_value(key)
+    if value is not None:
+        metrics.CACHE_LOOKUPS.labels(namespace, "redis_hit").inc()
+        local_cache.put(key, value)
+    else:
+        metrics.CACHE_LOOKUPS.labels(namespace, "miss").inc()
+    return value
 
 
 async def check_openai_moderation(text: str) -> bool:
-    response = client.moderations.create(model="omni-moderation-latest", input=text)
-    return response.results[0].flagged
+    async with timing.span("moderation"):
+        return await llm.moderate(text)
 
 
 async def analyze_and_store_themes(user_id: str, text: str, db: AsyncSession):
-    PASTORAL_KEYWORDS = [
-        "anxiety",
-        "sin",
-        "fear",
-        "trust",
-        "forgiveness",
-        "grief",
-        "hope",
-        "suffering",
-        "joy",
-        "love",
-        "mercy",
-        "healing",
-        "health",
-        "illness",
-        "peace",
-        "faith",
-        "repentance",
-        "gratitude",
-        "humility",
-        "patience",
-        "financial",
-        "loss",
-        "guidance",
-        "courage",
-        "compassion",
-        "loneliness",
-        "despair",
-        "temptation",
-        "doubt",
-        "shame",
-        "guilt",
-        "anger",
-        "envy",
-        "pride",
-        "confession",
-        "eucharist",
-        "adoration",
-        "rosary",
-        "prayer",
-        "sacrament",
-        "lectio divina",
-        "divine mercy",
-        "fasting",
-        "penance",
-        "intercession",
-        "blessing",
-        "worship",
-        "work",
-        "family",
-        "family issues",
-        "friendship",
-        "marriage",
-        "vocation",
-        "community",
-        "service",
-        "charity",
-        "conversion",
-        "discernment",
-        "perseverance",
-        "detachment",
-        "spiritual dryness",
-        "zeal",
-        "obedience",
-        "thanksgiving",
-        "Hopeless cases",
-        "faithfulness",
-        "trust in providence",
-        "purity",
-        "simplicity",
-        "mary",
-        "saints",
-        "intercession of saints",
-        "self-worth",
-        "identity",
-        "purpose",
-        "calling",
-        "mission",
-        "strength",
-        "light",
-        "freedom",
-        "renewal",
-        "salvation",
-        "redemption",
-        "truth",
-        "wisdom",
-        "understanding",
-        "discouragement",
-        "vulnerability",
-        "acceptance",
-    ]
-    prompt = (
-        f"From this text, extract up to 2 pastoral themes relevant to Catholic spirituality. "
-        f"Choose only from this list: {', '.join(PASTORAL_KEYWORDS)}. "
-        f"Return them as a comma-separated list, e.g., 'fear, trust'.\n"
-        f"Text: '{text}'"
-    )
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are an assistant that extracts spiritual themes.",
-            },
-            {"role": "user", "content": prompt},
-        ],
-    )
-    raw = response.choices[0].message.content.lower()
-    extracted = [t.strip() for t in raw.split(",") if t.strip() in PASTORAL_KEYWORDS]
-    print("extracted theme===>", extracted)
+    extracted = await extract_themes(text)
+    uow = UnitOfWork()
+    themes = await store_themes(user_id, extracted, db, uow)
+    await uow.persist(db)
+    return themes
+
+
+async def extract_themes(text: str) -> list:
+    async with timing.span("themes"):
+        return await _extract_themes(text)
+
+
+async def _extract_themes(text: str) -> list:
+    extracted = pastoral_themes.extract_local(text)
+    if extracted:
+        return extracted
+    # Nothing confident locally: fall back to the model.
+    response = await llm.chat(prompts.messages("themes", text=text), model="gpt-4o")
+    raw = response.lower()
+    extracted = [
+        t.strip() for t in raw.split(",") if t.strip() in pastoral_themes.PASTORAL_KEYWORD_SET
+    ][:2]
+    return extracted
+
+
+async def store_themes(user_id: str, extracted: list, db: AsyncSession, uow: UnitOfWork) -> list:
+    """
+    Merge extracted themes into the user's pastoral memory. The write is staged on uow.
+    """
     if not extracted:
         return []
 
@@ -483,26 +546,28 @@ async def analyze_and_store_themes(user_id: str, text: str, db: AsyncSession):
     # return [t.theme for t in updated[-3:]]
     # Fetch existing PastoralMemory row for the user
     result = await db.execute(
-        select(PastoralMemory).where(PastoralMemory.user_id == user_id)
+        select(PastoralMemory.themes).where(PastoralMemory.user_id == user_id)
     )
-    existing = result.scalars().first()
+    existing = result.first()
 
     if existing:
         # Merge extracted themes into existing ones
-        merged = existing.themes or []
+        merged = list(existing.themes or [])
         for theme in extracted:
             if theme not in merged:
                 merged.append(theme)
         # Keep only latest 3
         merged = merged[-3:]
-        existing.themes = merged
-        existing.updated_at = datetime.now()
     else:
         # No record yet: create new row with extracted themes (up to 3)
         merged = extracted[:3]
-        new_row = PastoralMemory(user_id=user_id, themes=merged)
-        db.add(new_row)
-
-    await db.commit()
+    uow.upsert(
+        PastoralMemory,
+        ["user_id"],
+        ["themes", "updated_at"],
+        id=uuid4(),
+        user_id=user_id,
+        themes=merged,
+    )
 
     return merged